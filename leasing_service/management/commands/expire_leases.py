@@ -0,0 +1,84 @@
+from argparse import ArgumentTypeError
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from leasing_service.models import Lease
+from listing_service import occupancy
+from listing_service.models import Property
+from listing_service.summaries import forget_properties
+from listing_service.versions import bump_version
+from notification_service.models import Notification
+
+
+def day(value):
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        # well formed but not a real day, like 2028-02-30
+        parsed = None
+    if parsed is None:
+        raise ArgumentTypeError(f"{value!r} is not a YYYY-MM-DD date")
+    return parsed
+
+
+class Command(BaseCommand):
+    help = "Archive every lease that has ended, free its property and notify the tenant. Safe to run from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=day, default=None,
+                            help="Expire leases ending on or before this YYYY-MM-DD date instead of today.")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Report how many leases have ended without changing them.")
+
+    def handle(self, *args, **options):
+        today = options['date'] or date.today()
+        # served by the (status, end_date) index
+        ended = Lease.objects.filter(status='active', end_date__lte=today)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"Would expire {ended.count()} leases"))
+            return
+
+        expired = freed = 0
+        while True:
+            # each batch drops out of `ended` once archived, so no cursor is needed
+            batch = list(
+                ended.order_by('end_date', 'id')
+                .values_list('id', 'user_id', 'property_id', 'property__title')[:options['batch_size']]
+            )
+            if not batch:
+                break
+
+            property_ids = {property_id for _, _, property_id, _ in batch}
+            with transaction.atomic():
+                Lease.objects.filter(id__in=[lease_id for lease_id, _, _, _ in batch]) \
+                    .update(status='expired', updated_at=timezone.now())
+                # a property stays leased while it still has a current or upcoming lease
+                still_leased = Lease.objects.filter(property=OuterRef('pk'), status='active')
+                freed += Property.objects.filter(id__in=property_ids, status='leased') \
+                    .exclude(Exists(still_leased)) \
+                    .update(status='available', version=F('version') + 1)
+                Notification.objects.bulk_create([
+                    Notification(
+                        user_id=user_id,
+                        message=f"Your lease for {title} has expired.",
+                        notification_type=Notification.lease,
+                        status=Notification.denied
+                    )
+                    for _, user_id, _, title in batch
+                ])
+            forget_properties(property_ids)
+            # the bulk update skips the Lease signals that drop cached calendars
+            occupancy.forget(property_ids)
+            expired += len(batch)
+
+        if expired:
+            # the bulk updates skip the save signals that usually do this
+            bump_version('properties', 'listing')
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} leases and freed {freed} properties"))
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leasing_service', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lease',
+            name='status',
+            field=models.CharField(choices=[('active', 'Active'), ('expired', 'Expired')], default='active', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='lease',
+            index=models.Index(fields=['property', 'start_date', 'end_date'], name='lease_property_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lease',
+            index=models.Index(fields=['status', 'end_date'], name='lease_status_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaserequest',
+            index=models.Index(fields=['property', 'status', 'start_date', 'end_date'], name='lease_request_period_idx'),
+        ),
+    ]
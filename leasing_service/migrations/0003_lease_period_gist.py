@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:12
+
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations
+
+
+def create_period_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS lease_property_period_gist "
+            "ON leasing_service_lease USING gist (property_id, daterange(start_date, end_date, '[]'))"
+        )
+
+
+def drop_period_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS lease_property_period_gist")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leasing_service', '0002_lease_status'),
+    ]
+
+    operations = [
+        # only runs on Postgres; lets the integer property_id share the GiST index with the range
+        BtreeGistExtension(),
+        migrations.RunPython(create_period_index, drop_period_index),
+    ]
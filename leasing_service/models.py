@@ -1,7 +1,23 @@
-from django.db import models
+from django.contrib.postgres.fields import DateRangeField
+from django.db import connection, models
+from django.db.backends.postgresql.psycopg_any import DateRange
+from django.db.models import F, Func, Value
 from user_service.models import CustomUser
 from listing_service.models import Property
 
+# a row's days as an inclusive Postgres daterange, the expression the lease GiST index covers
+PERIOD = Func(F('start_date'), F('end_date'), Value('[]'), function='daterange', output_field=DateRangeField())
+
+
+class LeaseQuerySet(models.QuerySet):
+    def overlapping(self, start_date, end_date):
+        """Rows whose dates share at least one day with start_date..end_date, both ends inclusive."""
+        if connection.vendor == 'postgresql':
+            # on leases this matches the GiST index created in migration 0002
+            return self.annotate(period=PERIOD).filter(period__overlap=DateRange(start_date, end_date, '[]'))
+        return self.filter(start_date__lte=end_date, end_date__gte=start_date)
+
+
 # Create your models here.
 class LeaseRequest(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="lease_requests")
@@ -16,10 +32,15 @@ class LeaseRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = LeaseQuerySet.as_manager()
+
     class Meta:
         unique_together = ('user', 'property')
         verbose_name = "Lease Request"
         verbose_name_plural = "Lease Requests"
+        indexes = [
+            models.Index(fields=['property', 'status', 'start_date', 'end_date'], name='lease_request_period_idx'),
+        ]
 
     def __str__(self):
         return f"Lease Request by {self.user} for {self.property} - {self.status}"
@@ -29,12 +50,24 @@ class Lease(models.Model):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name="leases")
     start_date = models.DateField()
     end_date = models.DateField()
+    # expired leases are kept as history; manage.py expire_leases archives them,
+    # so anything asking whether dates are booked filters on status='active'
+    status = models.CharField(max_length=20, choices=[
+        ('active', 'Active'),
+        ('expired', 'Expired'),
+    ], default='active')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = LeaseQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Lease"
         verbose_name_plural = "Leases"
+        indexes = [
+            models.Index(fields=['property', 'start_date', 'end_date'], name='lease_property_period_idx'),
+            models.Index(fields=['status', 'end_date'], name='lease_status_end_idx'),
+        ]
 
     def __str__(self):
         return f"Lease for {self.property} by {self.user} from {self.start_date} - {self.end_date}"
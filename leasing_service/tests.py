@@ -1,3 +1,250 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from leasing_service.models import Lease, LeaseRequest
+from leasing_service.views import approve_requests, deny_requests
+from listing_service import occupancy
+from listing_service.availability import available_between
+from listing_service.models import Property
+from notification_service.models import Notification
 
-# Create your tests here.
+
+class LeaseOverlapTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User = get_user_model()
+        self.librarian = User.objects.create_user(
+            username='librarian',
+            email='librarian@example.com',
+            password='librarianpass',
+            role='librarian'
+        )
+        self.patrons = [
+            User.objects.create_user(
+                username=f'patron{index}',
+                email=f'patron{index}@example.com',
+                password='patronpass',
+                role='patron'
+            )
+            for index in range(4)
+        ]
+        self.property = Property.objects.create(title="JPA Flat", location="JPA", price=800)
+        Lease.objects.create(user=self.patrons[0], property=self.property,
+                             start_date=date(2027, 9, 1), end_date=date(2027, 12, 31))
+        self.manage_url = reverse('leasing_service:manage_lease_requests')
+
+    def lease_request(self, patron, start_date, end_date):
+        return LeaseRequest.objects.create(user=patron, property=self.property, start_date=start_date, end_date=end_date)
+
+    # Test: a request overlapping an existing lease is refused at submit time
+    def test_submit_overlap(self):
+        self.client.force_login(self.patrons[1])
+        url = reverse('leasing_service:submit_lease_request', args=[self.property.id])
+        self.client.post(url, {'start_date': '2027-12-01', 'end_date': '2028-05-31'})
+        self.assertFalse(LeaseRequest.objects.exists())
+        self.client.post(url, {'start_date': '2028-01-01', 'end_date': '2028-05-31'})
+        self.assertTrue(LeaseRequest.objects.filter(user=self.patrons[1]).exists())
+
+    # Test: approval refuses to double-book the property
+    def test_approve_overlap(self):
+        lease_request = self.lease_request(self.patrons[1], date(2027, 12, 1), date(2028, 5, 31))
+        self.client.force_login(self.librarian)
+        self.client.post(self.manage_url, {'lease_request_id': lease_request.id, 'action': 'approve'})
+        lease_request.refresh_from_db()
+        self.assertEqual(lease_request.status, 'requested')
+        self.assertEqual(Lease.objects.count(), 1)
+
+    # Test: approving denies only the overlapping pending requests
+    def test_approve_denies_overlapping(self):
+        approved = self.lease_request(self.patrons[1], date(2028, 1, 1), date(2028, 5, 31))
+        clashing = self.lease_request(self.patrons[2], date(2028, 5, 1), date(2028, 8, 31))
+        later = self.lease_request(self.patrons[3], date(2028, 6, 1), date(2028, 8, 31))
+        self.client.force_login(self.librarian)
+        self.client.post(self.manage_url, {'lease_request_id': approved.id, 'action': 'approve'})
+
+        statuses = dict(LeaseRequest.objects.values_list('id', 'status'))
+        self.assertEqual(statuses, {approved.id: 'approved', clashing.id: 'denied', later.id: 'requested'})
+        self.assertEqual(Notification.objects.filter(user=self.patrons[2], status=Notification.denied).count(), 1)
+        self.assertFalse(Notification.objects.filter(user=self.patrons[3]).exists())
+
+    # Test: cancelling one of two leases leaves the property leased; cancelling the last frees it
+    def test_cancel_keeps_other_lease(self):
+        Property.objects.filter(id=self.property.id).update(status='leased')
+        later = Lease.objects.create(user=self.patrons[1], property=self.property,
+                                     start_date=date(2028, 1, 1), end_date=date(2028, 5, 31))
+        self.client.force_login(self.patrons[1])
+        self.client.post(reverse('leasing_service:cancel_lease', args=[later.id]))
+        self.assertFalse(Lease.objects.filter(id=later.id).exists())
+        self.assertEqual(Property.objects.get(id=self.property.id).status, 'leased')
+
+        self.client.force_login(self.patrons[0])
+        self.client.post(reverse('leasing_service:cancel_lease', args=[Lease.objects.get().id]))
+        self.assertEqual(Property.objects.get(id=self.property.id).status, 'available')
+
+    # Test: one bulk approval handles many requests, including clashes within the batch
+    def test_bulk_approve(self):
+        other = Property.objects.create(title="Corner Loft", location="Elliewood", price=1200)
+        first = self.lease_request(self.patrons[1], date(2028, 1, 1), date(2028, 5, 31))
+        clashing = self.lease_request(self.patrons[2], date(2028, 3, 1), date(2028, 8, 31))
+        blocked = self.lease_request(self.patrons[3], date(2027, 12, 1), date(2027, 12, 31))
+        elsewhere = LeaseRequest.objects.create(user=self.patrons[2], property=other,
+                                                start_date=date(2028, 1, 1), end_date=date(2028, 5, 31))
+
+        approved, conflicting, denied = approve_requests([first.id, clashing.id, blocked.id, elsewhere.id])
+        self.assertEqual({r.id for r in approved}, {first.id, elsewhere.id})
+        self.assertEqual([r.id for r in conflicting], [blocked.id])
+        self.assertEqual(denied, 1)
+        self.assertEqual(LeaseRequest.objects.get(id=clashing.id).status, 'denied')
+        self.assertEqual(LeaseRequest.objects.get(id=blocked.id).status, 'requested')
+        self.assertEqual(Property.objects.filter(status='leased').count(), 2)
+        self.assertEqual(Notification.objects.filter(status=Notification.approved).count(), 2)
+
+    # Test: bulk actions take the same number of queries for 1 and 3 requests
+    def test_bulk_queries(self):
+        counts = []
+        for year, patrons in ((2030, self.patrons[1:2]), (2031, self.patrons[1:4])):
+            requests_ = []
+            for index, patron in enumerate(patrons):
+                property_obj = Property.objects.create(title=f"Flat {year} {index}", location="JPA", price=800)
+                requests_.append(LeaseRequest.objects.create(
+                    user=patron, property=property_obj, start_date=date(year, 1, 1), end_date=date(year, 5, 31)
+                ))
+            with CaptureQueriesContext(connection) as queries:
+                approve_requests([r.id for r in requests_])
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+        pending = [self.lease_request(patron, date(2032, 1, 1), date(2032, 5, 31)) for patron in self.patrons[1:]]
+        with self.assertNumQueries(5):
+            self.assertEqual(deny_requests([r.id for r in pending]), 3)
+
+
+class ExpireLeasesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.patron = get_user_model().objects.create_user(
+            username='patron',
+            email='patron@example.com',
+            password='patronpass',
+            role='patron'
+        )
+        self.today = date(2028, 5, 31)
+        self.ended = Property.objects.create(title="Ended", location="JPA", price=800, status='leased')
+        self.renewed = Property.objects.create(title="Renewed", location="JPA", price=800, status='leased')
+        self.current = Property.objects.create(title="Current", location="JPA", price=800, status='leased')
+        self.lease(self.ended, date(2027, 9, 1), date(2028, 5, 1))
+        self.lease(self.renewed, date(2027, 9, 1), self.today)
+        self.lease(self.renewed, date(2028, 8, 15), date(2029, 5, 31))
+        self.lease(self.current, date(2027, 9, 1), date(2028, 6, 30))
+
+    def lease(self, property_obj, start_date, end_date):
+        return Lease.objects.create(user=self.patron, property=property_obj, start_date=start_date, end_date=end_date)
+
+    # Test: every ended lease is archived, and only properties with nothing else booked are freed
+    def test_expire(self):
+        out = StringIO()
+        call_command('expire_leases', date=self.today, batch_size=1, stdout=out)
+        self.assertIn("Expired 2 leases and freed 1 properties", out.getvalue())
+        self.assertEqual(Lease.objects.filter(status='expired').count(), 2)
+        statuses = dict(Property.objects.values_list('title', 'status'))
+        self.assertEqual(statuses, {'Ended': 'available', 'Renewed': 'leased', 'Current': 'leased'})
+        self.assertEqual(Notification.objects.filter(user=self.patron).count(), 2)
+
+        # a second run finds nothing left to do
+        call_command('expire_leases', date=self.today, stdout=out)
+        self.assertEqual(Notification.objects.filter(user=self.patron).count(), 2)
+
+    # Test: cached occupancy calendars drop the archived leases
+    def test_expire_forgets_occupancy(self):
+        month = date(2027, 10, 1)
+        self.assertNotEqual(occupancy.cached_month_bitmaps(self.ended.id, month, 1), {'2027-10': 0})
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('expire_leases', date=self.today, stdout=StringIO())
+        self.assertEqual(occupancy.cached_month_bitmaps(self.ended.id, month, 1), {'2027-10': 0})
+
+    # Test: a bad --date is an error rather than a silent run for today
+    def test_bad_date(self):
+        for value in ('soon', '2028-02-30'):
+            with self.assertRaises(CommandError):
+                call_command('expire_leases', '--date', value, stdout=StringIO())
+        self.assertFalse(Lease.objects.filter(status='expired').exists())
+
+    # Test: archived leases no longer book their dates anywhere
+    def test_expired_leases_ignored(self):
+        call_command('expire_leases', date=self.today, stdout=StringIO())
+        start, end = date(2027, 10, 1), date(2027, 10, 31)
+        self.assertIn(self.ended, available_between(Property.objects.all(), start, end))
+        self.assertNotIn(self.current, available_between(Property.objects.all(), start, end))
+        self.assertEqual(occupancy.month_bitmaps(self.ended.id, start, 1), {'2027-10': 0})
+
+        self.client.force_login(self.patron)
+        self.client.post(reverse('leasing_service:submit_lease_request', args=[self.ended.id]),
+                         {'start_date': '2027-10-01', 'end_date': '2027-10-31'})
+        lease_request = LeaseRequest.objects.get(property=self.ended)
+        approved, conflicting, denied = approve_requests([lease_request.id])
+        self.assertEqual(([r.id for r in approved], conflicting), ([lease_request.id], []))
+
+    # Test: my_leases only reads, and lists active leases
+    def test_my_leases_read_only(self):
+        ending = self.lease(self.ended, date.today() - timedelta(days=30), date.today())
+        self.client.force_login(self.patron)
+        response = self.client.get(reverse('leasing_service:my_leases'))
+        self.assertIn(ending, response.context['leases'])
+        self.assertFalse(Lease.objects.filter(status='expired').exists())
+        self.assertEqual(Property.objects.filter(status='available').count(), 0)
+
+
+class OccupancyCalendarTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.patron = get_user_model().objects.create_user(
+            username='patron',
+            email='patron@example.com',
+            password='patronpass',
+            role='patron'
+        )
+        self.property = Property.objects.create(title="JPA Flat", location="JPA", price=800, geocode_status='failed')
+        Lease.objects.create(user=self.patron, property=self.property,
+                             start_date=date(2027, 8, 30), end_date=date(2027, 9, 2))
+        self.url = reverse('listing_service:property_occupancy', args=[self.property.id])
+
+    # Test: each month is a bitmap of its leased days, clipped to the requested range
+    def test_bitmaps(self):
+        response = self.client.get(self.url, {'start': '2027-08', 'months': 3})
+        self.assertEqual(response.json(), {
+            'start': '2027-08',
+            'months': {'2027-08': 0b11 << 29, '2027-09': 0b11, '2027-10': 0},
+        })
+        self.assertEqual(self.client.get(self.url, {'start': '2027-09', 'months': 1}).json()['months'], {'2027-09': 0b11})
+
+    # Test: answers are cached per property until one of its leases changes
+    def test_cache(self):
+        params = {'start': '2027-10', 'months': 1}
+        self.client.get(self.url, params)
+        with self.assertNumQueries(1):
+            # just the property lookup
+            self.client.get(self.url, params)
+        with self.captureOnCommitCallbacks(execute=True):
+            Lease.objects.create(user=self.patron, property=self.property,
+                                 start_date=date(2027, 10, 1), end_date=date(2027, 10, 1))
+        self.assertEqual(self.client.get(self.url, params).json()['months'], {'2027-10': 1})
+
+    # Test: bad ranges are rejected
+    def test_bad_params(self):
+        for params in ({'start': '2027-13'}, {'start': 'soon'}, {'months': 0}, {'months': 25},
+                       {'start': '9999-12', 'months': 2}, {'start': '0000-01'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+    # Test: the details page no longer embeds the lease history
+    def test_details_page(self):
+        self.client.force_login(self.patron)
+        response = self.client.get(reverse('listing_service:property_details', args=[self.property.id]))
+        self.assertNotIn('leased_dates', response.context['details'])
+        self.assertContains(response, self.url)
@@ -4,8 +4,143 @@ from django.contrib import messages
 from leasing_service.models import LeaseRequest, Lease
 from listing_service.models import Property
 from notification_service.models import Notification
-from datetime import datetime, date
-from django.db.models import Q, Case, When, Value, IntegerField
+from datetime import datetime
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, Case, When, Value, IntegerField
+from django.template.defaultfilters import pluralize
+from django.utils import timezone
+from listing_service import occupancy
+from listing_service.summaries import forget_properties
+from listing_service.versions import bump_version
+
+def overlaps(a, b):
+    return a.start_date <= b.end_date and b.start_date <= a.end_date
+
+
+def approve_requests(request_ids):
+    """
+    Approve the given pending requests in one transaction and a fixed number
+    of queries. Their properties are locked first so concurrent approvals
+    can't double-book. A request that overlaps an existing lease, or an
+    earlier request approved in the same batch, is left pending. Other
+    pending requests overlapping an approved one are denied.
+    Returns (approved requests, requests left pending, number denied).
+    """
+    with transaction.atomic():
+        property_ids = LeaseRequest.objects.filter(id__in=request_ids, status='requested') \
+            .values_list('property_id', flat=True)
+        # locked in id order so two batches over the same properties can't deadlock
+        properties = {
+            property_instance.id: property_instance
+            for property_instance in Property.objects.select_for_update().filter(id__in=property_ids).order_by('id')
+        }
+        # re-read under the lock in case another librarian just handled some of them
+        candidates = list(
+            LeaseRequest.objects.filter(id__in=request_ids, status='requested', property_id__in=properties)
+            .order_by('start_date', 'id')
+        )
+        if not candidates:
+            return [], [], 0
+
+        window = (min(r.start_date for r in candidates), max(r.end_date for r in candidates))
+        booked = {}
+        for lease in Lease.objects.filter(property_id__in=properties, status='active').overlapping(*window):
+            booked.setdefault(lease.property_id, []).append(lease)
+
+        approved, conflicting = [], []
+        for lease_request in candidates:
+            if any(overlaps(lease_request, lease) for lease in booked.get(lease_request.property_id, ())):
+                conflicting.append(lease_request)
+                continue
+            approved.append(lease_request)
+            booked.setdefault(lease_request.property_id, []).append(lease_request)
+
+        now = timezone.now()
+        pending = LeaseRequest.objects.filter(property_id__in=properties, status='requested') \
+            .exclude(id__in=[r.id for r in approved + conflicting]) \
+            .overlapping(*window)
+        denied = [
+            other for other in pending
+            if any(overlaps(other, r) for r in approved if r.property_id == other.property_id)
+        ]
+        # conflicting requests lost to another request in this batch are denied too
+        denied += [
+            r for r in conflicting
+            if any(overlaps(r, winner) for winner in approved if winner.property_id == r.property_id)
+        ]
+        conflicting = [r for r in conflicting if r not in denied]
+        if not approved:
+            return [], conflicting, 0
+
+        for lease_request in approved:
+            lease_request.status = 'approved'
+            lease_request.updated_at = now
+        for lease_request in denied:
+            lease_request.status = 'denied'
+            lease_request.updated_at = now
+        LeaseRequest.objects.bulk_update(approved + denied, ['status', 'updated_at'])
+
+        Lease.objects.bulk_create([
+            Lease(
+                user_id=r.user_id,
+                property_id=r.property_id,
+                start_date=r.start_date,
+                end_date=r.end_date,
+            )
+            for r in approved
+        ])
+        leased_ids = {r.property_id for r in approved}
+        Property.objects.filter(id__in=leased_ids).update(status='leased', version=F('version') + 1)
+
+        Notification.objects.bulk_create([
+            Notification(
+                user_id=r.user_id,
+                message=f"Your lease request for {properties[r.property_id].title} has been approved.",
+                notification_type=Notification.lease,
+                status=Notification.approved
+            )
+            for r in approved
+        ] + [
+            Notification(
+                user_id=r.user_id,
+                message=f"Your lease request for {properties[r.property_id].title} has been denied because another request was approved.",
+                notification_type=Notification.lease,
+                status=Notification.denied
+            )
+            for r in denied
+        ])
+
+        # the bulk statements skip the save signals that usually do this
+        bump_version('properties', 'listing')
+        forget_properties(leased_ids)
+        occupancy.forget(leased_ids)
+
+    return approved, conflicting, len(denied)
+
+
+def deny_requests(request_ids):
+    """Deny the given pending requests with one UPDATE and one bulk insert of notifications."""
+    with transaction.atomic():
+        rows = list(
+            LeaseRequest.objects.filter(id__in=request_ids, status='requested')
+            .values_list('id', 'user_id', 'property__title')
+        )
+        if not rows:
+            return 0
+        # update() skips auto_now, and the history list is ordered by updated_at
+        LeaseRequest.objects.filter(id__in=[request_id for request_id, _, _ in rows]) \
+            .update(status='denied', updated_at=timezone.now())
+        Notification.objects.bulk_create([
+            Notification(
+                user_id=user_id,
+                message=f"Your lease request for {title} has been denied.",
+                notification_type=Notification.lease,
+                status=Notification.denied
+            )
+            for _, user_id, title in rows
+        ])
+    return len(rows)
+
 
 @login_required
 def submit_lease_request(request, property_id):
@@ -29,6 +164,11 @@ def submit_lease_request(request, property_id):
         except ValueError:
             messages.error(request, "Invalid date format. Please use YYYY-MM-DD.")
             return redirect('listing_service:property_details', property_id=property_id)
+
+        if Lease.objects.filter(property=property_instance, status='active') \
+                .overlapping(start_date_obj, end_date_obj).exists():
+            messages.error(request, "The property is already leased for some of those dates. Please choose other dates.")
+            return redirect('listing_service:property_details', property_id=property_id)
             
         existing_request = LeaseRequest.objects.filter(
             user=request.user, 
@@ -72,65 +212,29 @@ def manage_lease_requests(request):
     lease_requests = LeaseRequest.objects.all()
 
     if request.method == "POST":
-        lease_request_id = request.POST.get("lease_request_id")
+        # the bulk form sends lease_request_ids, each row's own buttons a single lease_request_id
+        request_ids = [
+            request_id for request_id in
+            request.POST.getlist("lease_request_ids") or [request.POST.get("lease_request_id", "")]
+            if request_id.isdigit()
+        ]
         action = request.POST.get("action")
-        lease_request = get_object_or_404(LeaseRequest, id=lease_request_id)
 
         if action == "approve":
-            Lease.objects.create(
-                user=lease_request.user,
-                property=lease_request.property,
-                start_date=lease_request.start_date,
-                end_date=lease_request.end_date,
-            )
-            lease_request.status = "approved"
-            lease_request.save()
-
-            lease_request.property.status = 'leased'
-            lease_request.property.save()
+            approved, conflicting, denied = approve_requests(request_ids)
+            if approved:
+                messages.success(request, f"Approved {len(approved)} lease request{pluralize(len(approved))}.")
+            if denied:
+                messages.success(request, f"Denied {denied} other pending request{pluralize(denied)} for the same dates.")
+            if conflicting:
+                messages.error(request, f"{len(conflicting)} request{pluralize(len(conflicting))} overlapped an existing lease and {'was' if len(conflicting) == 1 else 'were'} not approved.")
 
-            Notification.objects.create(
-                user=lease_request.user,
-                message=f"Your lease request for {lease_request.property.title} has been approved.",
-                notification_type=Notification.lease,
-                status=Notification.approved
-            )
-
-            other_requests = LeaseRequest.objects.filter(
-                property=lease_request.property,
-                status='requested'
-            ).exclude(id=lease_request.id)
-            
-            for other_request in other_requests:
-                other_request.status = 'denied'
-                other_request.save()
-                
-                Notification.objects.create(
-                    user=other_request.user,
-                    message=f"Your lease request for {lease_request.property.title} has been denied because another request was approved.",
-                    notification_type=Notification.lease,
-                    status=Notification.denied
-                )
-            
-            if other_requests.exists():
-                messages.success(request, f"Lease request for {lease_request.property.title} has been approved. All other pending requests for this property have been denied.")
-            else:
-                messages.success(request, f"Lease request for {lease_request.property.title} has been approved.")
-                
         elif action == "deny":
-            lease_request.status = "denied"
-            lease_request.save()
-            
-            Notification.objects.create(
-                user=lease_request.user,
-                message=f"Your lease request for {lease_request.property.title} has been denied.",
-                notification_type=Notification.lease,
-                status=Notification.denied
-            )
-            
-            messages.success(request, f"Lease request for {lease_request.property.title} has been denied.")
+            denied = deny_requests(request_ids)
+            if denied:
+                messages.success(request, f"Denied {denied} lease request{pluralize(denied)}.")
 
-    base_qs = LeaseRequest.objects.all()
+    base_qs = LeaseRequest.objects.select_related('user', 'property')
     if q:
         base_qs = base_qs.filter(
             Q(user__username__icontains=q) |
@@ -159,38 +263,31 @@ def manage_lease_requests(request):
 
 @login_required
 def my_leases(request):
-    leases = Lease.objects.filter(user=request.user).select_related('property')
-
-    for lease in leases:
-        if lease.end_date == date.today():
-            lease.property.status = 'available'
-            lease.property.save()
-
-            lease.delete()
-            messages.success(request, f"The lease for '{lease.property.title}' has been canceled due to expiration.")
-            Notification.objects.create(
-                    user=request.user,
-                    message=f"Your lease for {lease.property.title} has expired.",
-                    notification_type=Notification.lease,
-                    status=Notification.denied
-                )
-
-    leases = Lease.objects.filter(user=request.user).select_related('property')
-    lease_requests = LeaseRequest.objects.filter(user=request.user, status='requested')
-
+    # ended leases are archived by manage.py expire_leases, so this page only reads
+    leases = Lease.objects.filter(user=request.user, status='active').select_related('property')
+    lease_requests = LeaseRequest.objects.filter(user=request.user, status='requested').select_related('property')
 
     return render(request, 'leasing_service/my_leases.html', {'leases': leases, 'lease_requests': lease_requests})
 
 
 @login_required
 def cancel_lease(request, lease_id):
-    lease = get_object_or_404(Lease, id=lease_id, user=request.user)
-
+    lease = get_object_or_404(Lease.objects.select_related('property'), id=lease_id, user=request.user, status='active')
     property_instance = lease.property
-    property_instance.status = 'available'
-    property_instance.save()
 
-    lease.delete()
+    with transaction.atomic():
+        # same lock approve_requests takes, so a concurrent approval can't be missed below
+        list(Property.objects.select_for_update().filter(id=property_instance.id).values_list('id', flat=True))
+        lease.delete()
+        # a property stays leased while it still has another current or upcoming lease
+        still_leased = Lease.objects.filter(property=OuterRef('pk'), status='active')
+        freed = Property.objects.filter(id=property_instance.id, status='leased') \
+            .exclude(Exists(still_leased)) \
+            .update(status='available', version=F('version') + 1)
+        if freed:
+            # the bulk update skips the save signals that usually do this
+            bump_version('properties', 'listing')
+            forget_properties([property_instance.id])
 
     messages.success(request, f"The lease for '{property_instance.title}' has been canceled.")
     return redirect('leasing_service:my_leases')
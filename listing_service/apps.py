@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ListingServiceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'listing_service'
+
+    def ready(self):
+        from . import signals
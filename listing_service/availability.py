@@ -0,0 +1,34 @@
+from datetime import date
+
+from django.db.models import Exists, OuterRef
+from django.utils.dateparse import parse_date
+
+from leasing_service.models import Lease
+
+
+def parse(value):
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def dates_from(params):
+    """
+    (start, end) from the available_from/available_to parameters, or None
+    when neither is a valid date. A missing start means today and a missing
+    end leaves the range open.
+    """
+    start, end = parse(params.get('available_from')), parse(params.get('available_to'))
+    if start is None and end is None:
+        return None
+    start, end = start or date.today(), end or date.max
+    if end < start:
+        return None
+    return start, end
+
+
+def available_between(qs, start, end):
+    """Properties with no active lease overlapping start..end, as an anti-join on the lease period index."""
+    leases = Lease.objects.filter(property=OuterRef('pk'), status='active').overlapping(start, end)
+    return qs.filter(~Exists(leases))
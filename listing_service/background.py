@@ -0,0 +1,39 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# one worker keeps external lookups sequential, which also keeps geocoding
+# under Nominatim's 1 request/second policy
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='listing-background')
+_queued_keys = set()
+_queued_lock = threading.Lock()
+
+
+def _run(key, func, args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Background task %s failed", key)
+    finally:
+        with _queued_lock:
+            _queued_keys.discard(key)
+        close_old_connections()
+
+
+def submit_once(key, func, *args):
+    """
+    Run func(*args) on the background worker once the current transaction
+    commits. A task whose key is already queued is not queued again.
+    """
+    def submit():
+        with _queued_lock:
+            if key in _queued_keys:
+                return
+            _queued_keys.add(key)
+        _executor.submit(_run, key, func, args)
+
+    transaction.on_commit(submit)
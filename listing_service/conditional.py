@@ -0,0 +1,64 @@
+import hashlib
+from functools import wraps
+
+from django.contrib import messages
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def viewer_stamp(request):
+    """
+    The parts of a page that depend on who's looking: the user and the
+    navbar fields, plus the session's CSRF secret so a cached page never
+    carries a stale form token.
+    """
+    get_token(request)
+    user = request.user
+    if not user.is_authenticated:
+        return ('anonymous', request.META.get('CSRF_COOKIE'))
+    return (user.id, user.role, user.username, user.profile_image, request.META.get('CSRF_COOKIE'))
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def has_pending_messages(request):
+    # len() loads the messages without marking them shown
+    return len(messages.get_messages(request)) > 0
+
+
+def conditional_page(validators):
+    """
+    Like django.views.decorators.http.condition, but the ETag always
+    includes the viewer, responses are marked private and vary on Cookie,
+    and a page with flash messages waiting is always rendered so they aren't
+    lost behind a 304. validators(request, *args, **kwargs) returns
+    (etag parts, last modified datetime or None), or None to skip the check.
+    """
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or has_pending_messages(request):
+                return view(request, *args, **kwargs)
+
+            validated = validators(request, *args, **kwargs)
+            if validated is None:
+                return view(request, *args, **kwargs)
+            parts, last_modified = validated
+            etag = quote_etag(make_etag(viewer_stamp(request), parts))
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response.headers['ETag'] = etag
+                if timestamp:
+                    response.headers['Last-Modified'] = http_date(timestamp)
+            patch_vary_headers(response, ('Cookie',))
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return inner
+    return decorator
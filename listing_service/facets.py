@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import PROXIMITY_CHOICES, REGION_CHOICES, Property
+from .versions import get_version
+
+# query-string parameter -> Property field
+FACET_FIELDS = {
+    'types': 'property_type',
+    'regions': 'region',
+    'proximities': 'proximity',
+    'statuses': 'status',
+}
+# (code, label, lowest price, price it stays under); None leaves that side open
+PRICE_BUCKETS = [
+    ('under_800', 'Under $800', None, 800),
+    ('800_1200', '$800 to $1,200', 800, 1200),
+    ('1200_1600', '$1,200 to $1,600', 1200, 1600),
+    ('1600_up', '$1,600 and up', 1600, None),
+]
+FACETS = list(FACET_FIELDS) + ['prices']
+
+
+def facet_choices(facet):
+    if facet == 'types':
+        return Property._meta.get_field('property_type').choices
+    if facet == 'regions':
+        return REGION_CHOICES
+    if facet == 'proximities':
+        return PROXIMITY_CHOICES
+    if facet == 'statuses':
+        return Property._meta.get_field('status').choices
+    return [(code, label) for code, label, _, _ in PRICE_BUCKETS]
+
+
+def value_filter(facet, code):
+    if facet != 'prices':
+        return Q(**{FACET_FIELDS[facet]: code})
+    for bucket, _, low, high in PRICE_BUCKETS:
+        if bucket == code:
+            condition = Q()
+            if low is not None:
+                condition &= Q(price__gte=low)
+            if high is not None:
+                condition &= Q(price__lt=high)
+            return condition
+    # unknown bucket matches nothing
+    return Q(pk__in=[])
+
+
+def selection_filter(facet, selected):
+    """Q for one facet's checked values, or None when nothing (or "all") is checked."""
+    if not selected or 'all' in selected:
+        return None
+    condition = Q()
+    for code in selected:
+        condition |= value_filter(facet, code)
+    return condition
+
+
+def selections_from(params):
+    return {facet: params.getlist(facet) for facet in FACETS}
+
+
+def apply_selections(qs, selections):
+    for facet in FACETS:
+        condition = selection_filter(facet, selections.get(facet))
+        if condition is not None:
+            qs = qs.filter(condition)
+    return qs
+
+
+def facet_counts(qs, selections):
+    """
+    {facet: {code: count}} over qs in a single conditional-aggregation query.
+    Each facet's counts apply every other facet's selection but not its own,
+    so a count is what checking that value would return.
+    """
+    filters = {facet: selection_filter(facet, selections.get(facet)) for facet in FACETS}
+    aggregates, codes = {}, {}
+    for facet in FACETS:
+        others = Q()
+        for other, condition in filters.items():
+            if other != facet and condition is not None:
+                others &= condition
+        for index, (code, _) in enumerate(facet_choices(facet)):
+            alias = f"{facet}_{index}"
+            aggregates[alias] = Count('id', filter=value_filter(facet, code) & others)
+            codes[alias] = (facet, code)
+
+    counts = {facet: {} for facet in FACETS}
+    for alias, total in qs.order_by().aggregate(**aggregates).items():
+        facet, code = codes[alias]
+        counts[facet][code] = total
+    return counts
+
+
+def unfiltered_facet_counts(qs, visibility):
+    """facet_counts() with nothing selected, cached until properties change."""
+    key = f"listing_service:facets:{get_version('properties')}:{visibility}"
+    counts = cache.get(key)
+    if counts is None:
+        counts = facet_counts(qs, {})
+        cache.set(key, counts, settings.LISTING_CACHE_TIMEOUT)
+    return counts
@@ -0,0 +1,68 @@
+from collections import Counter, defaultdict
+
+
+def trigrams(text):
+    """
+    Trigrams of each word, padded the way pg_trgm pads them (two spaces
+    before, one after), so scores line up with Postgres similarity().
+    """
+    grams = set()
+    for word in text.lower().split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a, b):
+    """Shared trigrams over all trigrams of both strings, between 0 and 1."""
+    a, b = trigrams(a), trigrams(b)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class TrigramIndex:
+    """Inverted trigram index over (key, text) pairs for in-process fuzzy matching."""
+
+    def __init__(self, entries):
+        self.keys = []
+        self.sizes = []
+        self.postings = defaultdict(list)
+
+        for key, text in entries:
+            grams = trigrams(text)
+            position = len(self.keys)
+            self.keys.append(key)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.postings[gram].append(position)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def search(self, text, threshold=0.3, limit=None, word=False):
+        """
+        Return (score, key) pairs at or above threshold, best first. With
+        word=True the score is the share of the query's trigrams found in the
+        entry, like pg_trgm's word_similarity, so a short query can match
+        part of a longer title.
+        """
+        query = trigrams(text)
+        if not query:
+            return []
+
+        shared = Counter()
+        for gram in query:
+            shared.update(self.postings.get(gram, ()))
+
+        results = []
+        for position, count in shared.items():
+            if word:
+                score = count / len(query)
+            else:
+                score = count / (len(query) + self.sizes[position] - count)
+            if score >= threshold:
+                results.append((score, self.keys[position]))
+
+        results.sort(key=lambda result: result[0], reverse=True)
+        return results[:limit] if limit else results
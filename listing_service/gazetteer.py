@@ -0,0 +1,125 @@
+import hashlib
+import re
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .fuzzy import TrigramIndex
+from .models import GazetteerEntry
+
+STREET_SUFFIXES = {
+    'avenue': 'ave', 'boulevard': 'blvd', 'circle': 'cir', 'court': 'ct',
+    'drive': 'dr', 'highway': 'hwy', 'lane': 'ln', 'parkway': 'pkwy',
+    'place': 'pl', 'road': 'rd', 'square': 'sq', 'street': 'st',
+    'terrace': 'ter', 'trail': 'trl',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+}
+
+# everything from one of these tokens on is unit or locality detail the gazetteer does not carry
+STOP_TOKENS = {
+    'apt', 'apartment', 'unit', 'suite', 'ste', 'room', 'rm', 'floor',
+    'charlottesville', 'cville', 'albemarle', 'va', 'virginia', 'usa',
+}
+
+
+def canonical_address(address):
+    """Normalize a street address: lowercase, abbreviated suffixes, no unit or city/state/zip."""
+    words = re.sub(r"[^\w\s]", " ", (address or "").lower()).split()
+    canonical = []
+    for word in words:
+        if word in STOP_TOKENS or (canonical and re.fullmatch(r"\d{5}", word)):
+            break
+        canonical.append(STREET_SUFFIXES.get(word, word))
+    return " ".join(canonical)
+
+
+def canonical_key(canonical):
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+def _house_number(canonical):
+    first = canonical.split(" ", 1)[0]
+    return first if first.isdigit() else None
+
+
+class Gazetteer:
+    """In-memory exact, prefix and trigram indexes over the GazetteerEntry table."""
+
+    def __init__(self, rows):
+        self.exact = {}
+        self.coords = {}
+        for canonical, latitude, longitude in rows:
+            if not canonical:
+                continue
+            self.exact[canonical_key(canonical)] = (latitude, longitude)
+            self.coords[canonical] = (latitude, longitude)
+        self.sorted_addresses = sorted(self.coords)
+        self.trigrams = TrigramIndex((canonical, canonical) for canonical in self.sorted_addresses)
+
+    def __len__(self):
+        return len(self.coords)
+
+    def prefix_match(self, canonical):
+        """First address that extends the query by whole words, e.g. '12 main' -> '12 main st'."""
+        position = bisect_left(self.sorted_addresses, canonical + " ")
+        if position < len(self.sorted_addresses):
+            candidate = self.sorted_addresses[position]
+            if candidate.startswith(canonical + " "):
+                return candidate
+        return None
+
+    def fuzzy_match(self, canonical):
+        """Closest address by trigram similarity, never crossing to another house number."""
+        number = _house_number(canonical)
+        for score, candidate in self.trigrams.search(canonical, settings.GAZETTEER_FUZZY_THRESHOLD):
+            if _house_number(candidate) == number:
+                return candidate
+        return None
+
+    def lookup(self, address):
+        canonical = canonical_address(address)
+        if not canonical:
+            return None
+
+        hit = self.exact.get(canonical_key(canonical))
+        if hit is not None:
+            return hit
+
+        match = self.prefix_match(canonical) or self.fuzzy_match(canonical)
+        return self.coords[match] if match else None
+
+
+_gazetteer = None
+_gazetteer_stamp = None
+_checked_at = 0.0
+
+
+def get_gazetteer():
+    """
+    Process-wide Gazetteer, rebuilt when the table changes. The table is
+    re-checked at most every GAZETTEER_RELOAD_INTERVAL seconds.
+    """
+    global _gazetteer, _gazetteer_stamp, _checked_at
+
+    now = time.monotonic()
+    if _gazetteer is not None and now - _checked_at < settings.GAZETTEER_RELOAD_INTERVAL:
+        return _gazetteer
+
+    stamp = GazetteerEntry.objects.aggregate(count=Count('id'), last=Max('id'))
+    if _gazetteer is None or stamp != _gazetteer_stamp:
+        rows = GazetteerEntry.objects.values_list('address', 'latitude', 'longitude').iterator()
+        _gazetteer = Gazetteer(
+            (canonical_address(address), latitude, longitude) for address, latitude, longitude in rows
+        )
+        _gazetteer_stamp = stamp
+    _checked_at = now
+    return _gazetteer
+
+
+def reset_gazetteer():
+    """Drop the in-memory index so the next lookup rebuilds it."""
+    global _gazetteer, _gazetteer_stamp
+    _gazetteer = None
+    _gazetteer_stamp = None
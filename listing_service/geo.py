@@ -0,0 +1,110 @@
+import math
+
+EARTH_RADIUS_MI = 3958.8
+MILES_PER_DEGREE_LAT = 69.0
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9
+# '{' sorts after every geohash character, so [prefix, prefix + '{') is every hash in the cell
+GEOHASH_RANGE_END = "{"
+
+
+def parse_coordinate(value, limit):
+    """float(value), rejecting nan, inf and anything beyond +-limit with ValueError."""
+    value = float(value)
+    if not math.isfinite(value) or not -limit <= value <= limit:
+        raise ValueError(f"coordinate out of range: {value}")
+    return value
+
+
+def parse_latitude(value):
+    return parse_coordinate(value, 90)
+
+
+def parse_longitude(value):
+    return parse_coordinate(value, 180)
+
+
+def parse_bbox(value):
+    """(west, south, east, north) from a 'west,south,east,north' string, ValueError if malformed."""
+    west, south, east, north = value.split(',')
+    return parse_longitude(west), parse_latitude(south), parse_longitude(east), parse_latitude(north)
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_MI * math.asin(math.sqrt(a))
+
+
+def geohash_encode(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+
+    while len(chars) < precision:
+        # even bits split longitude, odd bits split latitude
+        value, interval = (lon, lon_range) if even else (lat, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            interval[0] = mid
+        else:
+            bits <<= 1
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = bit_count = 0
+
+    return "".join(chars)
+
+
+def geohash_cell_size(precision):
+    """(height, width) in degrees of a geohash cell at this precision."""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def bbox_around(lat, lon, radius_mi):
+    """(south, west, north, east) box that contains the circle of radius_mi around a point."""
+    lat_delta = radius_mi / MILES_PER_DEGREE_LAT
+    lon_delta = radius_mi / (MILES_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return lat - lat_delta, lon - lon_delta, lat + lat_delta, lon + lon_delta
+
+
+def covering_cells(south, west, north, east, max_cells=32, precision=GEOHASH_PRECISION):
+    """
+    Geohash prefixes of the finest precision (no finer than `precision`)
+    whose cells cover the box in at most max_cells cells.
+    """
+    finest, precision = precision, 1
+    for candidate in range(finest, 0, -1):
+        height, width = geohash_cell_size(candidate)
+        rows = math.floor((north + 90) / height) - math.floor((south + 90) / height) + 1
+        columns = math.floor((east + 180) / width) - math.floor((west + 180) / width) + 1
+        if rows * columns <= max_cells:
+            precision = candidate
+            break
+
+    height, width = geohash_cell_size(precision)
+    cells = set()
+    # walk cell centres from the cell holding the south-west corner
+    lat = (math.floor((south + 90) / height) + 0.5) * height - 90
+    while lat - height / 2 <= north:
+        lon = (math.floor((west + 180) / width) + 0.5) * width - 180
+        while lon - width / 2 <= east:
+            cells.add(geohash_encode(min(lat, 89.999999), min(lon, 179.999999), precision))
+            lon += width
+        lat += height
+    return sorted(cells)
+
+
+def zoom_to_precision(zoom):
+    """Geohash precision whose cells are roughly marker-sized at a web-map zoom level."""
+    for max_zoom, precision in ((2, 1), (4, 2), (7, 3), (9, 4), (12, 5), (14, 6), (16, 7)):
+        if zoom <= max_zoom:
+            return precision
+    return 8
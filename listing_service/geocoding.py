@@ -0,0 +1,135 @@
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from geopy.geocoders import Nominatim
+from geopy.exc import GeocoderUnavailable, GeocoderTimedOut
+
+from .background import submit_once
+from .gazetteer import get_gazetteer
+from .geo import geohash_encode
+from .regions import classify_point
+from .versions import bump_version
+
+
+class NominatimGeocoder:
+    """Public Nominatim over the network."""
+
+    # rate-limited by the geocode_properties throttle
+    network = True
+
+    def geocode(self, address):
+        try:
+            # timeout as 4 seconds and set user_agent
+            geolocator = Nominatim(user_agent="myApp", timeout=4)
+            location = geolocator.geocode(address)
+
+            if location:
+                return {
+                    'lat': location.latitude,
+                    'lon': location.longitude
+                }
+            else:
+                return {'lat': None, 'lon': None}
+
+        except (GeocoderUnavailable, GeocoderTimedOut) as e:
+            return {'lat': None, 'lon': None}
+        except Exception as e:
+            return {'lat': None, 'lon': None}
+
+
+class GazetteerGeocoder:
+    """Offline lookup against the imported local address gazetteer."""
+
+    network = False
+
+    def geocode(self, address):
+        hit = get_gazetteer().lookup(address)
+        if hit is None:
+            return {'lat': None, 'lon': None}
+        return {'lat': hit[0], 'lon': hit[1]}
+
+
+# helper function for geocode: first configured backend with an answer wins
+def geocode_address(address, throttle=None):
+    """throttle, if given, is called before each request to a network backend."""
+    for backend_path in settings.GEOCODER_BACKENDS:
+        backend = import_string(backend_path)()
+        if throttle is not None and getattr(backend, 'network', True):
+            throttle()
+        location = backend.geocode(address)
+        if location['lat'] is not None and location['lon'] is not None:
+            return location
+    return {'lat': None, 'lon': None}
+
+
+def normalize_address(address):
+    """Lowercase, drop punctuation and collapse whitespace so equivalent addresses compare equal."""
+    address = re.sub(r"[^\w\s]", " ", (address or "").lower())
+    return " ".join(address.split())
+
+
+def address_key(address):
+    """Stable hash of the normalized address, used as a lookup key."""
+    return hashlib.sha1(normalize_address(address).encode()).hexdigest()
+
+
+def geocode_fields(address, throttle=None):
+    """Geocode an address and return the Property fields to store."""
+    location = geocode_address(address, throttle)
+    found = location['lat'] is not None and location['lon'] is not None
+
+    fields = {
+        'latitude': location['lat'] if found else None,
+        'longitude': location['lon'] if found else None,
+        'geocode_status': 'ok' if found else 'failed',
+        'geocoded_at': timezone.now(),
+        'geohash': geohash_encode(location['lat'], location['lon']) if found else '',
+    }
+    if found:
+        fields.update(classify_point(location['lat'], location['lon']))
+    return fields
+
+
+def refresh_property_geocode(property_id):
+    """Geocode a single property and store the result."""
+    from .models import Property
+
+    property_obj = Property.objects.filter(id=property_id).only('id', 'location').first()
+    if property_obj is None:
+        return
+    Property.objects.filter(id=property_id).update(version=F('version') + 1, **geocode_fields(property_obj.location))
+    bump_version('properties', 'listing')
+
+
+def queue_geocode_refresh(property_id):
+    """Geocode a property on the background worker once the current transaction commits."""
+    submit_once(('geocode', property_id), refresh_property_geocode, property_id)
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, at most `capacity` saved up."""
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        self._refill()
+        if self.tokens < 1:
+            self.sleep((1 - self.tokens) / self.rate)
+            self._refill()
+        self.tokens -= 1
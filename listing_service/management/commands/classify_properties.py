@@ -0,0 +1,59 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from listing_service.models import Property
+from listing_service.regions import classify
+from listing_service.versions import bump_version
+
+
+class Command(BaseCommand):
+    help = "Assign region and proximity to every geocoded property from its coordinates."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Report how many properties would change without saving.")
+
+    def handle(self, *args, **options):
+        geocoded = Property.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        last_id = checked = changed = 0
+
+        while True:
+            batch = list(
+                geocoded.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', 'latitude', 'longitude', 'region', 'proximity')[:options['batch_size']]
+            )
+            if not batch:
+                break
+
+            ids, latitudes, longitudes, old_regions, old_proximities = zip(*batch)
+            regions, proximities = classify(latitudes, longitudes)
+
+            # one UPDATE per distinct (region, proximity) pair in the batch
+            ids_by_fields = defaultdict(list)
+            for property_id, region, proximity, old_region, old_proximity in zip(
+                ids, regions, proximities, old_regions, old_proximities
+            ):
+                # keep the librarian's region where no polygon matches
+                region = region or old_region
+                if (region, proximity) != (old_region, old_proximity):
+                    ids_by_fields[(region, proximity)].append(property_id)
+
+            if not options['dry_run']:
+                for (region, proximity), property_ids in ids_by_fields.items():
+                    Property.objects.filter(id__in=property_ids).update(
+                        region=region, proximity=proximity, version=F('version') + 1
+                    )
+
+            checked += len(batch)
+            changed += sum(len(property_ids) for property_ids in ids_by_fields.values())
+            last_id = ids[-1]
+
+        if changed and not options['dry_run']:
+            bump_version('properties', 'listing')
+
+        verb = "Would update" if options['dry_run'] else "Updated"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {changed} of {checked} geocoded properties"))
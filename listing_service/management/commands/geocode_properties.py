@@ -0,0 +1,117 @@
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from listing_service import geocoding
+from listing_service.models import Property
+from listing_service.regions import classify_point
+from listing_service.versions import bump_version
+
+
+class Command(BaseCommand):
+    help = "Geocode properties that have no stored coordinates, at a rate the geocoder allows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', type=float, default=settings.GEOCODE_RATE_LIMIT,
+                            help="Geocoder requests per second.")
+        parser.add_argument('--burst', type=int, default=1,
+                            help="Requests allowed back to back before throttling.")
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--checkpoint', default=settings.GEOCODE_CHECKPOINT_FILE,
+                            help="File recording the last processed property id.")
+        parser.add_argument('--reset', action='store_true',
+                            help="Ignore any saved checkpoint and start from the first property.")
+        parser.add_argument('--retry-failed', action='store_true',
+                            help="Also retry properties whose last geocode failed.")
+
+    def handle(self, *args, **options):
+        checkpoint = options['checkpoint']
+        statuses = ['pending', 'failed'] if options['retry_failed'] else ['pending']
+        bucket = geocoding.TokenBucket(options['rate'], capacity=options['burst'])
+
+        last_id = 0 if options['reset'] else self.load_checkpoint(checkpoint)
+        if last_id:
+            self.stdout.write(f"Resuming after property {last_id}")
+
+        queryset = Property.objects.filter(geocode_status__in=statuses)
+        total = queryset.filter(id__gt=last_id).count()
+        self.stdout.write(f"{total} properties to geocode")
+
+        # location string -> stored fields, so each address is geocoded once per run
+        resolved = {}
+        processed = lookups = 0
+        started = time.monotonic()
+
+        while True:
+            batch = list(
+                queryset.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', 'location')[:options['batch_size']]
+            )
+            if not batch:
+                break
+
+            ids_by_location = {}
+            for property_id, location in batch:
+                ids_by_location.setdefault(location.strip(), []).append(property_id)
+
+            for location, property_ids in ids_by_location.items():
+                if location not in resolved:
+                    resolved[location] = self.known_geocode(location)
+                if resolved[location] is None:
+                    # only network backends wait on the bucket; gazetteer hits run at full speed
+                    resolved[location] = geocoding.geocode_fields(location, throttle=bucket.acquire)
+                    lookups += 1
+                Property.objects.filter(id__in=property_ids).update(version=F('version') + 1, **resolved[location])
+
+            processed += len(batch)
+            last_id = batch[-1][0]
+            self.save_checkpoint(checkpoint, last_id)
+            self.report(processed, lookups, total, time.monotonic() - started)
+
+        self.clear_checkpoint(checkpoint)
+        if processed:
+            # the bulk updates skip the save signals that usually do this
+            bump_version('properties', 'listing')
+        self.stdout.write(self.style.SUCCESS(
+            f"Geocoded {processed} properties with {lookups} geocoder requests"
+        ))
+
+    def known_geocode(self, location):
+        """Reuse a successful geocode already stored for the same location string."""
+        known = Property.objects.filter(location=location, geocode_status='ok') \
+            .values('latitude', 'longitude', 'geocode_status', 'geocoded_at', 'geohash').first()
+        if known is not None:
+            known.update(classify_point(known['latitude'], known['longitude']))
+        return known
+
+    def report(self, processed, lookups, total, elapsed):
+        rate = processed / elapsed if elapsed else 0
+        remaining = total - processed
+        eta = f"{remaining / rate:.0f}s" if rate else "unknown"
+        self.stdout.write(
+            f"{processed}/{total} properties, {lookups} lookups, "
+            f"{rate:.2f} properties/s, ETA {eta}"
+        )
+
+    def load_checkpoint(self, path):
+        try:
+            with open(path) as checkpoint_file:
+                return json.load(checkpoint_file).get('last_id', 0)
+        except (OSError, ValueError):
+            return 0
+
+    def save_checkpoint(self, path, last_id):
+        # write then rename so an interrupted run never leaves a truncated file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as checkpoint_file:
+            json.dump({'last_id': last_id}, checkpoint_file)
+        os.replace(tmp_path, path)
+
+    def clear_checkpoint(self, path):
+        if os.path.exists(path):
+            os.remove(path)
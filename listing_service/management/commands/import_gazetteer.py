@@ -0,0 +1,77 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from listing_service.gazetteer import canonical_address, canonical_key, reset_gazetteer
+from listing_service.models import GazetteerEntry
+
+LATITUDE_COLUMNS = ('latitude', 'lat')
+LONGITUDE_COLUMNS = ('longitude', 'lon', 'lng')
+
+
+class Command(BaseCommand):
+    help = (
+        "Import address points for the offline geocoder from a CSV with an 'address' "
+        "column (or 'number' and 'street') plus latitude and longitude columns."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+        parser.add_argument('--replace', action='store_true',
+                            help="Delete existing gazetteer entries before importing.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['csv_path'], newline='', encoding='utf-8-sig') as csv_file:
+                entries = list(self.read_entries(csv.DictReader(csv_file)))
+        except OSError as e:
+            raise CommandError(f"Could not read {options['csv_path']}: {e}")
+
+        with transaction.atomic():
+            if options['replace']:
+                GazetteerEntry.objects.all().delete()
+            before = GazetteerEntry.objects.count()
+            # rows whose canonical address is already present are skipped
+            GazetteerEntry.objects.bulk_create(
+                entries, batch_size=options['batch_size'], ignore_conflicts=True
+            )
+            imported = GazetteerEntry.objects.count() - before
+
+        reset_gazetteer()
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} gazetteer entries ({len(entries) - imported} duplicates skipped)"
+        ))
+
+    def read_entries(self, reader):
+        columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+        lat_column = next((columns[c] for c in LATITUDE_COLUMNS if c in columns), None)
+        lon_column = next((columns[c] for c in LONGITUDE_COLUMNS if c in columns), None)
+        if lat_column is None or lon_column is None:
+            raise CommandError("CSV needs latitude and longitude columns.")
+        if 'address' not in columns and not ('number' in columns and 'street' in columns):
+            raise CommandError("CSV needs an 'address' column or 'number' and 'street' columns.")
+
+        for line, row in enumerate(reader, start=2):
+            if 'address' in columns:
+                address = row[columns['address']]
+            else:
+                address = f"{row[columns['number']]} {row[columns['street']]}"
+
+            canonical = canonical_address(address)
+            try:
+                latitude, longitude = float(row[lat_column]), float(row[lon_column])
+            except (TypeError, ValueError):
+                self.stderr.write(f"Skipping line {line}: bad coordinates")
+                continue
+            if not canonical:
+                self.stderr.write(f"Skipping line {line}: empty address")
+                continue
+
+            yield GazetteerEntry(
+                address=address.strip(),
+                address_key=canonical_key(canonical),
+                latitude=latitude,
+                longitude=longitude,
+            )
@@ -0,0 +1,78 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Q, Sum
+
+from listing_service.models import Property
+from listing_service.summaries import forget_properties
+from listing_service.versions import bump_version
+from review_service.models import Review
+
+STAR_FIELDS = ['stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5']
+AGGREGATE_FIELDS = ['rating_sum', 'review_count'] + STAR_FIELDS
+
+
+def star_counts():
+    # same buckets as Property.star_field: 1 takes anything under 2, 5 anything from 5 up
+    counts = {}
+    for star, field in enumerate(STAR_FIELDS, start=1):
+        bucket = Q()
+        if star > 1:
+            bucket &= Q(rating__gte=star)
+        if star < 5:
+            bucket &= Q(rating__lt=star + 1)
+        counts[field] = Count('id', filter=bucket)
+    return counts
+
+
+class Command(BaseCommand):
+    help = "Recompute every property's stored rating sum, review count and star histogram from its reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Report how many properties are out of step without saving.")
+
+    def handle(self, *args, **options):
+        last_id = checked = changed = 0
+
+        while True:
+            batch = list(
+                Property.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .only('id', 'version', *AGGREGATE_FIELDS)[:options['batch_size']]
+            )
+            if not batch:
+                break
+
+            # one grouped query per batch
+            actual = {
+                row['property']: row for row in Review.objects.filter(property__in=batch)
+                .values('property')
+                .annotate(rating_sum=Sum('rating'), review_count=Count('id'), **star_counts())
+            }
+
+            stale = []
+            for property_obj in batch:
+                row = actual.get(property_obj.id, {})
+                expected = {field: row.get(field) or 0 for field in AGGREGATE_FIELDS}
+                expected['rating_sum'] = Decimal(expected['rating_sum'])
+                if any(getattr(property_obj, field) != value for field, value in expected.items()):
+                    for field, value in expected.items():
+                        setattr(property_obj, field, value)
+                    property_obj.version = F('version') + 1
+                    stale.append(property_obj)
+
+            if stale and not options['dry_run']:
+                Property.objects.bulk_update(stale, AGGREGATE_FIELDS + ['version'])
+                forget_properties([property_obj.id for property_obj in stale])
+
+            checked += len(batch)
+            changed += len(stale)
+            last_id = batch[-1].id
+
+        if changed and not options['dry_run']:
+            bump_version('listing')
+
+        verb = "Would fix" if options['dry_run'] else "Fixed"
+        self.stdout.write(self.style.SUCCESS(f"{verb} ratings on {changed} of {checked} properties"))
@@ -0,0 +1,75 @@
+from django.db import transaction
+from django.db.models import F
+
+from . import summaries
+from .models import CollectionProperty, Property
+from .versions import bump_version
+
+
+def claim(collection, property_ids):
+    """Make collection the private home of these properties and hide them everywhere else."""
+    Property.objects.filter(id__in=property_ids).update(private_collection=collection, version=F('version') + 1)
+    CollectionProperty.objects.filter(property_id__in=property_ids).exclude(collection=collection) \
+        .update(hidden=True)
+
+
+def release(property_ids):
+    """Return these properties to no private collection and unhide them in every collection."""
+    Property.objects.filter(id__in=property_ids).update(private_collection=None, version=F('version') + 1)
+    CollectionProperty.objects.filter(property_id__in=property_ids).update(hidden=False)
+
+
+def sync_members(collection, property_ids, was_private=False):
+    """
+    Make the collection's members exactly the selected properties, claiming
+    or releasing them as its privacy requires, in a fixed number of queries.
+    Returns the selected properties left out because another private
+    collection already holds them, as (id, title) pairs.
+    """
+    with transaction.atomic():
+        selected = {
+            property_id: (title, private_collection_id)
+            for property_id, title, private_collection_id in Property.objects.filter(id__in=property_ids)
+            .values_list('id', 'title', 'private_collection_id')
+        }
+        current = set(CollectionProperty.objects.filter(collection=collection).values_list('property_id', flat=True))
+        owned = set(Property.objects.filter(private_collection=collection).values_list('id', flat=True))
+
+        to_add = selected.keys() - current
+        to_remove = current - selected.keys()
+
+        # a collection turning private claims everything selected; one staying private only its new members
+        candidates = selected.keys() if collection.private and not was_private else to_add
+        conflicts = set()
+        if collection.private:
+            conflicts = {
+                property_id for property_id in candidates
+                if selected[property_id][1] not in (None, collection.id)
+            }
+        to_add -= conflicts
+
+        if to_remove:
+            CollectionProperty.objects.filter(collection=collection, property_id__in=to_remove).delete()
+
+        to_release = owned if not collection.private else owned & to_remove
+        if to_release:
+            release(to_release)
+
+        if to_add:
+            CollectionProperty.objects.bulk_create([
+                CollectionProperty(collection=collection, property_id=property_id, hidden=False)
+                for property_id in to_add
+            ])
+
+        to_claim = set(candidates) - conflicts if collection.private else set()
+        if to_claim:
+            claim(collection, to_claim)
+
+        changed = to_add | to_remove | to_release | to_claim
+        if changed:
+            # the bulk statements skip the save signals that usually do this
+            bump_version('properties', 'listing')
+            summaries.forget_collections([collection.id])
+            summaries.forget_properties(changed)
+
+    return sorted((property_id, selected[property_id][0]) for property_id in conflicts)
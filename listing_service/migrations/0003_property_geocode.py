@@ -0,0 +1,38 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listing_service', '0002_add_region_and_proximity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='geocode_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ok', 'OK'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='geocoded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='property_type',
+            field=models.CharField(choices=[('Apartment', 'Apartment'), ('Condo', 'Condo'), ('Room', 'Room'), ('House', 'House'), ('Other', 'Other')], max_length=50),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listing_service', '0003_property_geocode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalkScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address_key', models.CharField(max_length=40, unique=True)),
+                ('address', models.CharField(max_length=255)),
+                ('walkscore', models.IntegerField(blank=True, null=True)),
+                ('bikescore', models.IntegerField(blank=True, null=True)),
+                ('transitscore', models.IntegerField(blank=True, null=True)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+        ),
+    ]
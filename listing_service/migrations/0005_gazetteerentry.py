@@ -0,0 +1,26 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listing_service', '0004_walkscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GazetteerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.CharField(max_length=255)),
+                ('address_key', models.CharField(max_length=40, unique=True)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+            ],
+            options={
+                'verbose_name_plural': 'Gazetteer entries',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:45
+
+from django.db import migrations, models
+
+from listing_service.geo import geohash_encode
+
+
+def fill_geohash(apps, schema_editor):
+    Property = apps.get_model('listing_service', 'Property')
+    geocoded = Property.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    for property_obj in geocoded.only('id', 'latitude', 'longitude').iterator():
+        Property.objects.filter(id=property_obj.id).update(
+            geohash=geohash_encode(property_obj.latitude, property_obj.longitude)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listing_service', '0005_gazetteerentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, max_length=12),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
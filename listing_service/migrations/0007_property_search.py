@@ -0,0 +1,53 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:02
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        Property = apps.get_model('listing_service', 'Property')
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS listing_service_property_search_gin "
+            "ON listing_service_property USING gin (search_vector)"
+        )
+        Property.objects.update(search_vector=(
+            SearchVector('title', weight='A', config='english')
+            + SearchVector('location', weight='B', config='english')
+            + SearchVector('description', weight='C', config='english')
+        ))
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS listing_service_property_fts "
+            "USING fts5(title, description, location, tokenize = 'porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO listing_service_property_fts (rowid, title, description, location) "
+            "SELECT id, title, description, location FROM listing_service_property"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS listing_service_property_search_gin")
+    elif vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS listing_service_property_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listing_service', '0006_property_geohash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
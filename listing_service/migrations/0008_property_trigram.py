@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:10
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for column in ('title', 'location'):
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS listing_service_property_{column}_trgm "
+                f"ON listing_service_property USING gin ({column} gin_trgm_ops)"
+            )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for column in ('title', 'location'):
+            schema_editor.execute(f"DROP INDEX IF EXISTS listing_service_property_{column}_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listing_service', '0007_property_search'),
+    ]
+
+    operations = [
+        # only runs on Postgres
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
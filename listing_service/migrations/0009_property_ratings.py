@@ -0,0 +1,48 @@
+# Generated by Django 5.1.6 on 2026-10-18 07:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listing_service', '0008_property_trigram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='rating_sum',
+            field=models.DecimalField(decimal_places=1, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='stars_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='stars_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='stars_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='stars_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='stars_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listing_service', '0009_property_ratings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -1,6 +1,11 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import F
 from user_service.models import CustomUser
 
+from .geo import geohash_encode
+from .regions import classify_point
+
 PROPERTY_CHOICES = [
     ('Apartment',   'Apartment'),
     ('Condo',       'Condo'),
@@ -32,6 +37,12 @@ PROXIMITY_CHOICES = [
     ('albemarle',       'Albemarle County'),
 ]
 
+GEOCODE_STATUS_CHOICES = [
+    ('pending', 'Pending'),
+    ('ok',      'OK'),
+    ('failed',  'Failed'),
+]
+
 class Property(models.Model):
     title = models.CharField(max_length=255)
     owner = models.ForeignKey(
@@ -62,6 +73,34 @@ class Property(models.Model):
         blank=True,
     )
 
+    # stored geocode so page views never call the geocoder inline
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geocode_status = models.CharField(
+        max_length=10,
+        choices=GEOCODE_STATUS_CHOICES,
+        default='pending',
+        db_index=True,
+    )
+    geocoded_at = models.DateTimeField(null=True, blank=True)
+    # spatial index: bounding-box searches become range scans over geohash prefixes
+    geohash = models.CharField(max_length=12, blank=True, db_index=True)
+    # full-text index on Postgres (GIN); unused on SQLite, which has an FTS5 table instead
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # review aggregates kept in step by the review views, so listings never join reviews;
+    # stars_N counts ratings from N up to (not including) N + 1
+    rating_sum = models.DecimalField(max_digits=10, decimal_places=1, default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    # bumped by every change a listing card shows; part of the card's cache key
+    version = models.PositiveIntegerField(default=1, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
     private_collection = models.ForeignKey(
         'Collection',
         on_delete=models.SET_NULL,
@@ -69,12 +108,85 @@ class Property(models.Model):
         related_name='private_properties'
     )
 
+    SEPARATELY_UPDATED_FIELDS = (
+        'search_vector', 'rating_sum', 'review_count', 'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5',
+    )
+
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_coordinates = (instance.__dict__.get('latitude'), instance.__dict__.get('longitude'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self.has_coordinates:
+            self.geohash = geohash_encode(self.latitude, self.longitude)
+            coordinates = (self.latitude, self.longitude)
+            moved = getattr(self, '_saved_coordinates', coordinates) != coordinates
+            for field, value in classify_point(self.latitude, self.longitude).items():
+                # a librarian's choice stands until the property moves
+                if moved or not getattr(self, field):
+                    setattr(self, field, value)
+        else:
+            self.geohash = ''
+        updating = not self._state.adding
+        if updating:
+            if kwargs.get('update_fields') is None:
+                # record_rating and index_property keep these up to date with their own UPDATEs,
+                # so writing back the values loaded here would undo a concurrent change
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name not in self.SEPARATELY_UPDATED_FIELDS
+                ]
+            self.version = F('version') + 1
+        super().save(*args, **kwargs)
+        if updating:
+            self.refresh_from_db(fields=['version'])
+        self._saved_coordinates = (self.latitude, self.longitude)
+
     @property
     def is_private(self):
         return self.private_collection is not None
+
+    @property
+    def has_coordinates(self):
+        return self.latitude is not None and self.longitude is not None
+
+    @property
+    def average_rating(self):
+        if not self.review_count:
+            return "N/A"
+        return round(self.rating_sum / self.review_count, 1)
+
+    @staticmethod
+    def star_field(rating):
+        return f"stars_{min(max(int(rating), 1), 5)}"
+
+    @classmethod
+    def record_rating(cls, property_id, added=None, removed=None):
+        """
+        Apply one review's rating change (a new rating, a removed one, or
+        both for an edit) to the stored aggregates in a single UPDATE.
+        """
+        rating_sum = F('rating_sum')
+        review_count = F('review_count')
+        stars = {}
+        if removed is not None:
+            rating_sum -= removed
+            review_count -= 1
+            field = cls.star_field(removed)
+            stars[field] = stars.get(field, F(field)) - 1
+        if added is not None:
+            rating_sum += added
+            review_count += 1
+            field = cls.star_field(added)
+            stars[field] = stars.get(field, F(field)) + 1
+        cls.objects.filter(id=property_id).update(
+            rating_sum=rating_sum, review_count=review_count, version=F('version') + 1, **stars
+        )
     
 class Collection(models.Model):
     title = models.CharField(max_length=255)
@@ -133,3 +245,33 @@ class CollectionAccess(models.Model):
 
     class Meta:
         unique_together = ('collection', 'user')
+
+
+class WalkScore(models.Model):
+    # sha1 of the normalized address, so properties sharing an address share a row
+    address_key = models.CharField(max_length=40, unique=True)
+    address = models.CharField(max_length=255)
+    walkscore = models.IntegerField(null=True, blank=True)
+    bikescore = models.IntegerField(null=True, blank=True)
+    transitscore = models.IntegerField(null=True, blank=True)
+    description = models.CharField(max_length=255, blank=True)
+    # non-empty when the lookup failed; failures are cached too, with a shorter TTL
+    error = models.CharField(max_length=255, blank=True)
+    fetched_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Walk Score for {self.address}"
+
+
+class GazetteerEntry(models.Model):
+    # local address points used to geocode without calling Nominatim
+    address = models.CharField(max_length=255)
+    address_key = models.CharField(max_length=40, unique=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+
+    class Meta:
+        verbose_name_plural = "Gazetteer entries"
+
+    def __str__(self):
+        return self.address
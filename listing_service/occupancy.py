@@ -0,0 +1,63 @@
+import calendar
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+
+from leasing_service.models import Lease
+
+from .versions import bump_version, get_version
+
+OCCUPANCY_KEY = "listing_service:occupancy:{}:{}:{}:{}"
+MAX_MONTHS = 24
+
+
+def version_name(property_id):
+    return f"occupancy:{property_id}"
+
+
+def add_months(month, count):
+    """First day of the month `count` months after `month`."""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_key(month):
+    return f"{month.year:04d}-{month.month:02d}"
+
+
+def month_bitmaps(property_id, first_month, months):
+    """
+    {'YYYY-MM': bitmap} for each month from first_month, where bit d - 1 is
+    set when day d is covered by an active lease. One query on the lease period index.
+    """
+    end_month = add_months(first_month, months)
+    last_day = date.fromordinal(end_month.toordinal() - 1)
+    bitmaps = {month_key(add_months(first_month, offset)): 0 for offset in range(months)}
+
+    leases = Lease.objects.filter(property_id=property_id, status='active').overlapping(first_month, last_day) \
+        .values_list('start_date', 'end_date')
+    for start_date, end_date in leases:
+        start_date, end_date = max(start_date, first_month), min(end_date, last_day)
+        month = start_date.replace(day=1)
+        while month <= end_date:
+            days_in_month = calendar.monthrange(month.year, month.month)[1]
+            low = start_date.day if month == start_date.replace(day=1) else 1
+            high = end_date.day if month == end_date.replace(day=1) else days_in_month
+            bitmaps[month_key(month)] |= ((1 << (high - low + 1)) - 1) << (low - 1)
+            month = add_months(month, 1)
+    return bitmaps
+
+
+def cached_month_bitmaps(property_id, first_month, months):
+    """month_bitmaps(), cached per property until one of its leases changes."""
+    key = OCCUPANCY_KEY.format(get_version(version_name(property_id)), property_id, month_key(first_month), months)
+    bitmaps = cache.get(key)
+    if bitmaps is None:
+        bitmaps = month_bitmaps(property_id, first_month, months)
+        cache.set(key, bitmaps, settings.LISTING_CACHE_TIMEOUT)
+    return bitmaps
+
+
+def forget(property_ids):
+    bump_version(*[version_name(property_id) for property_id in property_ids])
@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+from django.core import signing
+from django.db.models import Q
+
+CURSOR_SALT = 'listing_service.pagination'
+
+
+def keyset_filter(ordering, values):
+    """
+    Rows strictly after `values` in `ordering`, e.g. for ('title', 'id'):
+    title > t OR (title = t AND id > i).
+    """
+    condition = Q()
+    for position, key in enumerate(ordering):
+        field = key.lstrip('-')
+        lookup = 'lt' if key.startswith('-') else 'gt'
+        step = Q(**{f'{field}__{lookup}': values[position]})
+        for earlier, earlier_key in enumerate(ordering[:position]):
+            step &= Q(**{earlier_key.lstrip('-'): values[earlier]})
+        condition |= step
+    return condition
+
+
+def encode_cursor(ordering, obj):
+    values = []
+    for key in ordering:
+        value = getattr(obj, key.lstrip('-'))
+        values.append(str(value) if isinstance(value, Decimal) else value)
+    return signing.dumps({'o': list(ordering), 'v': values}, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(ordering, cursor):
+    """Values of the last row seen, or None for a missing, tampered or mismatched cursor."""
+    if not cursor:
+        return None
+    try:
+        data = signing.loads(cursor, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        return None
+    # a cursor from another sort order can't continue this one
+    if data.get('o') != list(ordering) or len(data.get('v', ())) != len(ordering):
+        return None
+    return data['v']
+
+
+def keyset_page(qs, ordering, cursor, page_size):
+    """
+    One page of qs in `ordering`, which must end with a unique key such as id.
+    Returns (rows, next_cursor); next_cursor is None on the last page. Each page
+    is a single indexed range scan, so later pages cost the same as the first.
+    """
+    qs = qs.order_by(*ordering)
+    values = decode_cursor(ordering, cursor)
+    if values is not None:
+        qs = qs.filter(keyset_filter(ordering, values))
+
+    rows = list(qs[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(ordering, rows[-1])
+    return rows, next_cursor
+
+
+def page_urls(request, next_cursor):
+    """(next page URL, first page URL) keeping every other query parameter."""
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    first_url = f"{request.path}?{params.urlencode()}" if request.GET.get('cursor') else None
+    next_url = None
+    if next_cursor:
+        params['cursor'] = next_cursor
+        next_url = f"{request.path}?{params.urlencode()}"
+    return next_url, first_url
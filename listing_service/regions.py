@@ -0,0 +1,116 @@
+import numpy as np
+
+from .geo import EARTH_RADIUS_MI
+
+# the Rotunda, used as the reference point for "distance from Grounds"
+GROUNDS = (38.0356, -78.5034)
+
+# approximate outlines as (lat, lon) vertices; the first polygon containing a point wins
+REGION_POLYGONS = {
+    'central_grounds': [
+        [(38.028, -78.514), (38.038, -78.514), (38.038, -78.499), (38.028, -78.499)],
+    ],
+    'north_grounds': [
+        [(38.046, -78.530), (38.062, -78.530), (38.062, -78.512), (38.046, -78.512)],
+    ],
+    'rugby_corridor': [
+        [(38.038, -78.506), (38.048, -78.506), (38.048, -78.490), (38.038, -78.490)],
+    ],
+    'university_corner': [
+        [(38.028, -78.499), (38.038, -78.499), (38.038, -78.486), (38.028, -78.486)],
+    ],
+    'jpa': [
+        [(38.018, -78.526), (38.028, -78.526), (38.028, -78.499), (38.018, -78.499)],
+    ],
+    'downtown_mall': [
+        [(38.024, -78.486), (38.038, -78.486), (38.038, -78.468), (38.024, -78.468)],
+    ],
+    'barracks_road': [
+        [(38.048, -78.512), (38.056, -78.512), (38.056, -78.490), (38.048, -78.490)],
+    ],
+    'frys_spring': [
+        [(38.005, -78.535), (38.018, -78.535), (38.018, -78.505), (38.005, -78.505)],
+    ],
+    'greenbrier': [
+        [(38.056, -78.512), (38.075, -78.512), (38.075, -78.470), (38.056, -78.470)],
+    ],
+    'pantops': [
+        [(38.020, -78.460), (38.055, -78.460), (38.055, -78.415), (38.020, -78.415)],
+    ],
+    'shadwell': [
+        # Shadwell, east of Pantops
+        [(38.000, -78.415), (38.030, -78.415), (38.030, -78.370), (38.000, -78.370)],
+        # Ivy, west of the city
+        [(38.040, -78.640), (38.075, -78.640), (38.075, -78.560), (38.040, -78.560)],
+    ],
+}
+
+CITY_BOUNDARY = [
+    (38.007, -78.524), (38.022, -78.533), (38.052, -78.528), (38.070, -78.505),
+    (38.066, -78.470), (38.046, -78.446), (38.020, -78.452), (38.008, -78.480),
+]
+
+# (upper bound in miles from Grounds, proximity code)
+PROXIMITY_BANDS = [
+    (0.25, 'on_grounds'),
+    (0.5, 'within_0_5_mi'),
+    (1.0, '0_5_to_1_mi'),
+    (2.0, '1_to_2_mi'),
+]
+
+
+def distances_from_grounds(latitudes, longitudes):
+    """Vectorized haversine distance in miles from Grounds."""
+    lat = np.radians(latitudes)
+    lon = np.radians(longitudes)
+    grounds_lat, grounds_lon = np.radians(GROUNDS)
+    a = (np.sin((lat - grounds_lat) / 2) ** 2
+         + np.cos(lat) * np.cos(grounds_lat) * np.sin((lon - grounds_lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS_MI * np.arcsin(np.sqrt(a))
+
+
+def points_in_polygon(latitudes, longitudes, polygon):
+    """Ray-casting point-in-polygon test over arrays of points."""
+    inside = np.zeros(len(latitudes), dtype=bool)
+    vertices = len(polygon)
+    for i in range(vertices):
+        lat1, lon1 = polygon[i]
+        lat2, lon2 = polygon[(i + 1) % vertices]
+        crosses = (lat1 > latitudes) != (lat2 > latitudes)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            edge_lon = lon1 + (latitudes - lat1) * (lon2 - lon1) / (lat2 - lat1)
+        inside ^= crosses & (longitudes < edge_lon)
+    return inside
+
+
+def classify(latitudes, longitudes):
+    """
+    Region and proximity codes for arrays of coordinates. Points outside
+    every region polygon get an empty region code.
+    """
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+
+    regions = np.full(len(latitudes), '', dtype=object)
+    for code, polygons in REGION_POLYGONS.items():
+        for polygon in polygons:
+            unassigned = regions == ''
+            regions[unassigned & points_in_polygon(latitudes, longitudes, polygon)] = code
+
+    distances = distances_from_grounds(latitudes, longitudes)
+    in_city = points_in_polygon(latitudes, longitudes, CITY_BOUNDARY)
+    proximities = np.where(in_city, 'charlottesville', 'albemarle').astype(object)
+    # widest band first so nearer bands overwrite it
+    for limit, code in reversed(PROXIMITY_BANDS):
+        proximities[distances <= limit] = code
+
+    return regions, proximities
+
+
+def classify_point(latitude, longitude):
+    """Fields to store for one point; region is left out when no polygon contains it."""
+    regions, proximities = classify([latitude], [longitude])
+    fields = {'proximity': proximities[0]}
+    if regions[0]:
+        fields['region'] = regions[0]
+    return fields
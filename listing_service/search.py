@@ -0,0 +1,195 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import connection, transaction
+from django.db.models import Case, F, FloatField, Func, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Greatest
+
+from .fuzzy import TrigramIndex
+from .versions import get_version
+
+# Postgres keeps a weighted tsvector on Property.search_vector behind a GIN index;
+# SQLite keeps an FTS5 shadow table keyed by property id. Both are created by
+# migration 0007 and kept in sync by index_property/unindex_property.
+SEARCH_VECTOR = (
+    SearchVector('title', weight='A', config='english')
+    + SearchVector('location', weight='B', config='english')
+    + SearchVector('description', weight='C', config='english')
+)
+FTS_TABLE = 'listing_service_property_fts'
+# matching and ranking both run inside the property query, so no id list ever leaves SQLite
+FTS_MATCHES = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+
+_fts_available = None
+# in-process fallback for fuzzy search where pg_trgm isn't available
+_trigram_index = None
+_trigram_index_version = None
+
+
+def fts_available():
+    global _fts_available
+    if _fts_available is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            _fts_available = cursor.fetchone() is not None
+    return _fts_available
+
+
+def backend():
+    if connection.vendor == 'postgresql':
+        return 'postgres'
+    if connection.vendor == 'sqlite' and fts_available():
+        return 'fts5'
+    return None
+
+
+def fts_match_expression(query):
+    # every word must match, each as a prefix; quoting keeps FTS5 syntax out of user input
+    words = re.findall(r"\w+", query)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+class FTSRank(Func):
+    """bm25 relevance of each property row for an FTS5 match expression, higher is better."""
+    # renders as: MATCH <expression> AND rowid = <property id column>
+    template = (
+        f"(SELECT -bm25({FTS_TABLE}, 10.0, 1.0, 5.0) FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %(expressions)s)"
+    )
+    arg_joiner = " AND rowid = "
+    output_field = FloatField()
+
+    def __init__(self, expression):
+        super().__init__(Value(expression), F('id'))
+
+
+def fts_matching(qs, query, rank=False):
+    expression = fts_match_expression(query)
+    if not expression:
+        return qs.none()
+    qs = qs.filter(id__in=RawSQL(FTS_MATCHES, [expression]))
+    return qs.annotate(search_rank=FTSRank(expression)) if rank else qs
+
+
+def icontains_filter(query):
+    return (
+        Q(title__icontains=query) |
+        Q(description__icontains=query) |
+        Q(location__icontains=query)
+    )
+
+
+def matching(qs, query):
+    """Restrict qs to properties matching the search query."""
+    search_backend = backend()
+    if search_backend == 'postgres':
+        return qs.filter(search_vector=SearchQuery(query, search_type='websearch', config='english'))
+    if search_backend == 'fts5':
+        return fts_matching(qs, query)
+    return qs.filter(icontains_filter(query))
+
+
+def ranked(qs, query):
+    """Like matching(), with a search_rank annotation where higher is more relevant."""
+    search_backend = backend()
+    if search_backend == 'postgres':
+        search_query = SearchQuery(query, search_type='websearch', config='english')
+        # ts_rank returns real; as double precision the keyset cursor's float compares back exactly
+        return qs.filter(search_vector=search_query) \
+            .annotate(search_rank=Cast(SearchRank(F('search_vector'), search_query), FloatField()))
+    if search_backend == 'fts5':
+        return fts_matching(qs, query, rank=True)
+    return qs.filter(icontains_filter(query)).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def with_ranks(qs, ranks):
+    """Restrict qs to the ids in {property id: rank} and annotate each with its search_rank."""
+    return qs.filter(id__in=list(ranks)).annotate(search_rank=Case(
+        *[When(id=property_id, then=Value(rank)) for property_id, rank in ranks.items()],
+        default=Value(0.0),
+        output_field=FloatField(),
+    ))
+
+
+def trigram_index():
+    """Trigram index over property titles and locations, rebuilt after any property changes."""
+    global _trigram_index, _trigram_index_version
+    from .models import Property
+
+    version = get_version('properties')
+    if _trigram_index is None or _trigram_index_version != version:
+        rows = Property.objects.values_list('id', 'title', 'location').iterator()
+        _trigram_index = TrigramIndex((property_id, f"{title} {location}") for property_id, title, location in rows)
+        _trigram_index_version = version
+    return _trigram_index
+
+
+def fuzzy_ranked(qs, query):
+    """
+    Typo-tolerant matches on title and location, annotated with search_rank
+    (trigram word similarity, higher is closer). At most FUZZY_SEARCH_LIMIT
+    of the properties in qs, closest first.
+    """
+    threshold = settings.FUZZY_SEARCH_THRESHOLD
+    limit = settings.FUZZY_SEARCH_LIMIT
+    if connection.vendor == 'postgresql':
+        # a local setting ends with the transaction, so it can't leak to the next user of a pooled connection;
+        # the matches are fetched inside it because the <% operator, and so the trigram indexes, filter on it
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)", [str(threshold)])
+            matches = dict(
+                qs.filter(Q(title__trigram_word_similar=query) | Q(location__trigram_word_similar=query))
+                .annotate(search_rank=Greatest(
+                    TrigramWordSimilarity(query, 'title'),
+                    TrigramWordSimilarity(query, 'location'),
+                ))
+                .order_by('-search_rank', 'id')
+                .values_list('id', 'search_rank')[:limit]
+            )
+        return with_ranks(qs, matches)
+
+    # the index covers every property, so drop the ones qs can't see before applying the limit
+    candidates = trigram_index().search(query, threshold, word=True)
+    matches = {}
+    for start in range(0, len(candidates), limit):
+        batch = {property_id: score for score, property_id in candidates[start:start + limit]}
+        visible = set(qs.filter(id__in=list(batch)).values_list('id', flat=True))
+        for property_id, score in batch.items():
+            if property_id in visible and len(matches) < limit:
+                matches[property_id] = score
+        if len(matches) >= limit:
+            break
+    return with_ranks(qs, matches)
+
+
+def find(qs, query, rank=False):
+    """Full-text matches for query, or fuzzy matches when the query matches nothing as typed."""
+    results = ranked(qs, query) if rank else matching(qs, query)
+    if results.exists():
+        return results
+    return fuzzy_ranked(qs, query)
+
+
+def index_property(property_obj):
+    from .models import Property
+
+    search_backend = backend()
+    if search_backend == 'postgres':
+        Property.objects.filter(id=property_obj.id).update(search_vector=SEARCH_VECTOR)
+    elif search_backend == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [property_obj.id])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, description, location) VALUES (%s, %s, %s, %s)",
+                [property_obj.id, property_obj.title, property_obj.description, property_obj.location],
+            )
+
+
+def unindex_property(property_id):
+    # the Postgres vector is deleted with its row
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [property_id])
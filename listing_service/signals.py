@@ -0,0 +1,94 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from leasing_service.models import Lease
+from review_service.models import Review
+
+from . import occupancy, search, summaries, visibility
+from .models import Collection, CollectionAccess, CollectionProperty, Property
+from .versions import bump_version
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+@receiver(post_save, sender=Collection)
+@receiver(post_delete, sender=Collection)
+@receiver(post_save, sender=CollectionProperty)
+@receiver(post_delete, sender=CollectionProperty)
+@receiver(m2m_changed, sender=CollectionProperty)
+def properties_changed(sender, **kwargs):
+    # a collection's privacy and membership decide who can see its properties, so they count too
+    bump_version('properties', 'listing')
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def reviews_changed(sender, **kwargs):
+    # listing cards show each property's rating
+    bump_version('listing')
+
+
+@receiver(post_save, sender=Lease)
+@receiver(post_delete, sender=Lease)
+def leases_changed(sender, instance, **kwargs):
+    # the availability filter reads lease dates
+    bump_version('listing')
+    occupancy.forget([instance.property_id])
+
+
+@receiver(post_save, sender=Property)
+def index_property(sender, instance, **kwargs):
+    search.index_property(instance)
+
+
+@receiver(post_delete, sender=Property)
+def unindex_property(sender, instance, **kwargs):
+    search.unindex_property(instance.id)
+
+
+@receiver(post_save, sender=Collection)
+@receiver(post_delete, sender=Collection)
+def collections_changed(sender, **kwargs):
+    # privacy flips, new private collections and owner changes all reshape who sees what
+    bump_version('collections')
+
+
+@receiver(post_save, sender=CollectionAccess)
+@receiver(post_delete, sender=CollectionAccess)
+def access_changed(sender, instance, **kwargs):
+    visibility.forget_user(instance.user_id)
+    # collection pages show access and request state
+    bump_version('collection_access')
+
+
+@receiver(post_save, sender=CollectionProperty)
+@receiver(post_delete, sender=CollectionProperty)
+def membership_changed(sender, instance, **kwargs):
+    summaries.forget_collections([instance.collection_id])
+
+
+@receiver(m2m_changed, sender=CollectionProperty)
+def memberships_changed(sender, instance, reverse, pk_set, **kwargs):
+    if not reverse:
+        summaries.forget_collections([instance.pk])
+    elif pk_set:
+        summaries.forget_collections(pk_set)
+    else:
+        # clear() from the property side doesn't say which collections it left
+        summaries.forget_properties([instance.pk])
+
+
+@receiver(post_save, sender=Property)
+def property_summaries_changed(sender, instance, **kwargs):
+    # price, status and rating all feed the summaries of every collection holding it
+    summaries.forget_properties([instance.id])
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_summaries_changed(sender, instance, **kwargs):
+    summaries.forget_properties([instance.property_id])
+
+
+@receiver(post_delete, sender=Collection)
+def collection_deleted(sender, instance, **kwargs):
+    summaries.forget_collections([instance.id])
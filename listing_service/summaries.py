@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min, Q, Sum
+
+from .models import CollectionProperty
+
+SUMMARY_KEY = "listing_service:collection_summary:{}"
+
+EMPTY_SUMMARY = {
+    'property_count': 0,
+    'min_price': None,
+    'max_price': None,
+    'avg_price': None,
+    'average_rating': "N/A",
+    'available_count': 0,
+    'leased_count': 0,
+}
+
+
+def compute_summaries(collection_ids):
+    """{collection id: summary} over each collection's visible properties, in one grouped query."""
+    rows = (
+        CollectionProperty.objects.filter(collection_id__in=collection_ids, hidden=False)
+        .values('collection_id')
+        .annotate(
+            property_count=Count('id'),
+            min_price=Min('property__price'),
+            max_price=Max('property__price'),
+            avg_price=Avg('property__price'),
+            rating_sum=Sum('property__rating_sum'),
+            review_count=Sum('property__review_count'),
+            available_count=Count('id', filter=Q(property__status='available')),
+            leased_count=Count('id', filter=Q(property__status='leased')),
+        )
+    )
+
+    summaries = {collection_id: dict(EMPTY_SUMMARY) for collection_id in collection_ids}
+    for row in rows:
+        rating_sum, review_count = row.pop('rating_sum'), row.pop('review_count')
+        # weighted by review, so one heavily reviewed property counts for more than an unreviewed one
+        row['average_rating'] = round(rating_sum / review_count, 1) if review_count else "N/A"
+        if row['avg_price'] is not None:
+            row['avg_price'] = round(row['avg_price'], 2)
+        summaries[row.pop('collection_id')] = row
+    return summaries
+
+
+def get_summaries(collection_ids):
+    """
+    Summaries for the given collections, computing and caching only the
+    ones not already cached.
+    """
+    keys = {SUMMARY_KEY.format(collection_id): collection_id for collection_id in collection_ids}
+    cached = cache.get_many(keys)
+    summaries = {keys[key]: summary for key, summary in cached.items()}
+
+    missing = [collection_id for key, collection_id in keys.items() if key not in cached]
+    if missing:
+        fresh = compute_summaries(missing)
+        cache.set_many(
+            {SUMMARY_KEY.format(collection_id): summary for collection_id, summary in fresh.items()},
+            settings.LISTING_CACHE_TIMEOUT,
+        )
+        summaries.update(fresh)
+    return summaries
+
+
+def attach_summaries(collections):
+    """Set .summary on each collection in a page."""
+    page_summaries = get_summaries([collection.id for collection in collections])
+    for collection in collections:
+        collection.summary = page_summaries[collection.id]
+    return collections
+
+
+def get_summary(collection_id):
+    return get_summaries([collection_id])[collection_id]
+
+
+def forget_collections(collection_ids):
+    """Drop these summaries once the current transaction commits, or right away outside one."""
+    keys = [SUMMARY_KEY.format(collection_id) for collection_id in collection_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def forget_properties(property_ids):
+    """
+    Drop the summaries of every collection holding any of these properties,
+    looked up now so memberships deleted in this transaction still count.
+    """
+    forget_collections(set(
+        CollectionProperty.objects.filter(property_id__in=property_ids).values_list('collection_id', flat=True)
+    ))
@@ -1,7 +1,31 @@
-from django.test import TestCase, Client
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+import requests
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from listing_service.models import Property, Collection, CollectionAccess
+from django.utils import timezone
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+from listing_service.facets import FACETS, facet_counts
+from listing_service.gazetteer import reset_gazetteer
+from listing_service.geo import geohash_encode
+from listing_service.geocoding import TokenBucket, address_key, geocode_address
+from listing_service.models import Property, Collection, CollectionAccess, CollectionProperty, GazetteerEntry, WalkScore
+from listing_service.pagination import keyset_page
+from listing_service.regions import classify
+from listing_service.summaries import get_summary
+from listing_service.versions import bump_version, get_version
+from leasing_service.models import Lease
+from listing_service.visibility import hidden_collection_ids
+from review_service.models import Review
 
 class UserProfileViewTests(TestCase):
     def setUp(self):
@@ -300,4 +324,1241 @@ class CollectionAccessTests(TestCase):
         self.client.login(username='librarian', password='librarianpass')
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
-'''
\ No newline at end of file
+'''
+
+class PropertyGeocodeTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User = get_user_model()
+
+        self.librarian = User.objects.create_user(
+            username='librarian',
+            email='librarian@example.com',
+            password='librarianpass',
+            role='librarian'
+        )
+
+        self.property = Property.objects.create(
+            title="Geocoded Property",
+            owner=self.librarian,
+            location="1815 Jefferson Park Ave",
+            price=1000,
+            latitude=38.0293,
+            longitude=-78.5131,
+            geocode_status='ok'
+        )
+
+    # Test: details page reads the stored coordinates and never calls the geocoder
+    @mock.patch('listing_service.geocoding.geocode_address')
+    def test_details_uses_stored_coordinates(self, geocode):
+        self.client.force_login(self.librarian)
+        response = self.client.get(reverse('listing_service:property_details', args=[self.property.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['details']['lat'], 38.0293)
+        self.assertEqual(response.context['details']['lon'], -78.5131)
+        geocode.assert_not_called()
+
+    # Test: never-geocoded rows are queued for a background refresh instead
+    @mock.patch('listing_service.views.queue_geocode_refresh')
+    @mock.patch('listing_service.geocoding.geocode_address')
+    def test_details_queues_pending_property(self, geocode, queue_refresh):
+        pending = Property.objects.create(
+            title="Pending Property",
+            owner=self.librarian,
+            location="1 Rugby Rd",
+            price=900
+        )
+        self.client.force_login(self.librarian)
+        response = self.client.get(reverse('listing_service:property_details', args=[pending.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['details']['geocode_pending'])
+        self.assertFalse(response.context['details']['easter'])
+        queue_refresh.assert_called_once_with(pending.id)
+        geocode.assert_not_called()
+
+    # Test: editing the location stores a fresh geocode
+    @mock.patch('listing_service.geocoding.geocode_address', return_value={'lat': 38.04, 'lon': -78.50})
+    def test_edit_property_geocodes_changed_location(self, geocode):
+        self.client.force_login(self.librarian)
+        self.client.post(reverse('listing_service:edit_property', args=[self.property.id]), {
+            'title': self.property.title,
+            'property_type': 'Apartment',
+            'description': 'Updated',
+            'location': '100 Main St',
+            'price': 1000,
+        })
+        self.property.refresh_from_db()
+        geocode.assert_called_once_with('100 Main St', None)
+        self.assertEqual((self.property.latitude, self.property.longitude), (38.04, -78.50))
+        self.assertEqual(self.property.geocode_status, 'ok')
+
+
+class GeocodePropertiesCommandTests(TestCase):
+    def setUp(self):
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+        self.lookups = []
+
+        for i, location in enumerate(["1 Rugby Rd", "1 Rugby Rd", "100 Main St", "Nowhere"]):
+            Property.objects.create(title=f"Property {i}", location=location, price=1000)
+
+    # local stub geocoder standing in for Nominatim
+    def stub_geocode(self, address, throttle=None):
+        self.lookups.append(address)
+        if address == "Nowhere":
+            return {'lat': None, 'lon': None}
+        return {'lat': 38.0 + len(self.lookups), 'lon': -78.5}
+
+    def run_command(self, **options):
+        with mock.patch('listing_service.geocoding.geocode_address', side_effect=self.stub_geocode):
+            call_command('geocode_properties', rate=1000, checkpoint=self.checkpoint, stdout=StringIO(), **options)
+
+    # Test: identical locations are geocoded once and failures are recorded
+    def test_backfill_dedupes_locations(self):
+        self.run_command()
+        self.assertEqual(sorted(self.lookups), ["1 Rugby Rd", "100 Main St", "Nowhere"])
+        rugby = Property.objects.filter(location="1 Rugby Rd")
+        self.assertEqual(rugby.filter(geocode_status='ok').count(), 2)
+        self.assertEqual(len(set(rugby.values_list('latitude', flat=True))), 1)
+        self.assertEqual(Property.objects.get(location="Nowhere").geocode_status, 'failed')
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    # Test: a saved checkpoint resumes after the last processed property
+    def test_backfill_resumes_from_checkpoint(self):
+        second = Property.objects.order_by('id')[1]
+        with open(self.checkpoint, 'w') as checkpoint_file:
+            json.dump({"last_id": second.id}, checkpoint_file)
+
+        self.run_command()
+        self.assertEqual(sorted(self.lookups), ["100 Main St", "Nowhere"])
+        self.assertEqual(Property.objects.filter(geocode_status='pending').count(), 2)
+
+    # Test: the token bucket waits once the burst is spent
+    def test_token_bucket_throttles(self):
+        now = [0.0]
+        waits = []
+
+        def sleep(seconds):
+            waits.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=2, capacity=1, clock=lambda: now[0], sleep=sleep)
+        bucket.acquire()
+        bucket.acquire()
+        self.assertEqual(waits, [0.5])
+
+    # Test: only network backends wait for the throttle
+    @override_settings(GEOCODER_BACKENDS=[
+        'listing_service.geocoding.GazetteerGeocoder',
+        'listing_service.geocoding.NominatimGeocoder',
+    ])
+    @mock.patch('listing_service.geocoding.NominatimGeocoder.geocode', return_value={'lat': 1.0, 'lon': 2.0})
+    @mock.patch('listing_service.geocoding.GazetteerGeocoder.geocode')
+    def test_throttle_skips_offline_backends(self, gazetteer, nominatim):
+        throttle = mock.Mock()
+        gazetteer.return_value = {'lat': 38.0, 'lon': -78.5}
+        geocode_address("1 Rugby Rd", throttle)
+        throttle.assert_not_called()
+
+        gazetteer.return_value = {'lat': None, 'lon': None}
+        geocode_address("1 Somewhere Else", throttle)
+        throttle.assert_called_once()
+
+
+class WalkScoreCacheTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User = get_user_model()
+        self.patron = User.objects.create_user(
+            username='patron',
+            email='patron@example.com',
+            password='patronpass',
+            role='patron'
+        )
+        self.property = Property.objects.create(
+            title="Scored Property",
+            location="1815 Jefferson Park Ave",
+            price=1000,
+            latitude=38.0293,
+            longitude=-78.5131,
+            geocode_status='ok'
+        )
+        self.url = reverse('listing_service:get_walk_score', args=[self.property.id])
+
+    def api_response(self, data):
+        response = mock.Mock()
+        response.json.return_value = data
+        return response
+
+    # Test: the first lookup is stored and repeat views are served from the table
+    @mock.patch('listing_service.walkscore.requests.get')
+    def test_scores_are_cached(self, api_get):
+        api_get.return_value = self.api_response({
+            'status': 1, 'walkscore': 80, 'bike': {'score': 70}, 'transit': {'score': 40}
+        })
+        self.client.force_login(self.patron)
+        first = self.client.get(self.url).json()
+        second = self.client.get(self.url).json()
+
+        self.assertEqual(first['walkscore'], 80)
+        self.assertEqual(second, first)
+        self.assertEqual(api_get.call_count, 1)
+        self.assertEqual(WalkScore.objects.count(), 1)
+
+    # Test: failed lookups are cached so the API is not retried on every view
+    @mock.patch('listing_service.walkscore.requests.get', side_effect=requests.exceptions.Timeout("timed out"))
+    def test_failures_are_cached(self, api_get):
+        self.client.force_login(self.patron)
+        self.assertEqual(self.client.get(self.url).status_code, 500)
+        self.assertEqual(self.client.get(self.url).status_code, 500)
+        self.assertEqual(api_get.call_count, 1)
+
+    # Test: stale scores are served immediately and refreshed in the background
+    @mock.patch('listing_service.walkscore.submit_once')
+    @mock.patch('listing_service.walkscore.requests.get')
+    def test_stale_scores_refresh_in_background(self, api_get, submit_once):
+        WalkScore.objects.create(
+            address_key=address_key(self.property.location),
+            address=self.property.location,
+            walkscore=55,
+            fetched_at=timezone.now() - timedelta(days=365)
+        )
+        self.client.force_login(self.patron)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.json()['walkscore'], 55)
+        api_get.assert_not_called()
+        submit_once.assert_called_once()
+
+
+@override_settings(GEOCODER_BACKENDS=['listing_service.geocoding.GazetteerGeocoder'])
+class GazetteerGeocoderTests(TestCase):
+    def setUp(self):
+        reset_gazetteer()
+        csv_path = os.path.join(tempfile.mkdtemp(), 'addresses.csv')
+        with open(csv_path, 'w') as csv_file:
+            csv_file.write(
+                "address,latitude,longitude\n"
+                "1815 Jefferson Park Avenue,38.0293,-78.5131\n"
+                "1815 Jefferson Park Ave,0,0\n"
+                "100 Rugby Road,38.0401,-78.5035\n"
+            )
+        call_command('import_gazetteer', csv_path, stdout=StringIO())
+
+    # Test: duplicate canonical addresses are imported once
+    def test_import_skips_duplicates(self):
+        self.assertEqual(GazetteerEntry.objects.count(), 2)
+
+    # Test: exact hits ignore case, suffix spelling, unit and city/state/zip
+    def test_exact_match(self):
+        location = geocode_address("1815 jefferson park ave., Apt 4, Charlottesville, VA 22903")
+        self.assertEqual(location, {'lat': 38.0293, 'lon': -78.5131})
+
+    # Test: prefix and typo-tolerant matches on the same house number
+    def test_prefix_and_fuzzy_match(self):
+        self.assertEqual(geocode_address("100 Rugby")['lat'], 38.0401)
+        self.assertEqual(geocode_address("1815 Jeferson Park Ave")['lat'], 38.0293)
+        self.assertIsNone(geocode_address("1817 Jefferson Park Ave")['lat'])
+
+    # Test: Nominatim is only consulted when the gazetteer has no answer
+    @override_settings(GEOCODER_BACKENDS=[
+        'listing_service.geocoding.GazetteerGeocoder',
+        'listing_service.geocoding.NominatimGeocoder',
+    ])
+    @mock.patch('listing_service.geocoding.NominatimGeocoder.geocode', return_value={'lat': 1.0, 'lon': 2.0})
+    def test_nominatim_fallback(self, nominatim):
+        self.assertEqual(geocode_address("100 Rugby Rd")['lat'], 38.0401)
+        nominatim.assert_not_called()
+        self.assertEqual(geocode_address("1 Somewhere Else")['lat'], 1.0)
+        nominatim.assert_called_once()
+
+
+class GeoSearchTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User = get_user_model()
+        self.patron = User.objects.create_user(
+            username='patron',
+            email='patron@example.com',
+            password='patronpass',
+            role='patron'
+        )
+        self.librarian = User.objects.create_user(
+            username='librarian',
+            email='librarian@example.com',
+            password='librarianpass',
+            role='librarian'
+        )
+        private_collection = Collection.objects.create(title="Private", private=True, owner=self.librarian)
+
+        # the Rotunda, a nearby JPA apartment, a private listing and one in Pantops
+        self.rotunda = self.create_property("Rotunda", 38.0356, -78.5034)
+        self.jpa = self.create_property("JPA", 38.0293, -78.5131)
+        self.private = self.create_property("Private", 38.0340, -78.5050, private_collection=private_collection)
+        self.pantops = self.create_property("Pantops", 38.0330, -78.4460)
+        self.url = reverse('listing_service:geo_search_properties')
+
+    def create_property(self, title, latitude, longitude, **kwargs):
+        return Property.objects.create(
+            title=title, location=title, price=1000,
+            latitude=latitude, longitude=longitude, geocode_status='ok', **kwargs
+        )
+
+    # Test: radius search returns nearby visible properties sorted by distance
+    def test_radius_search_sorted_by_distance(self):
+        self.client.force_login(self.patron)
+        response = self.client.get(self.url, {'lat': 38.0356, 'lon': -78.5034, 'radius': 1})
+        ids = [p['id'] for p in response.json()['properties']]
+        self.assertEqual(ids, [self.rotunda.id, self.jpa.id])
+
+    # Test: librarians also see private-collection properties
+    def test_librarian_sees_private_properties(self):
+        self.client.force_login(self.librarian)
+        response = self.client.get(self.url, {'lat': 38.0356, 'lon': -78.5034, 'radius': 1})
+        ids = [p['id'] for p in response.json()['properties']]
+        self.assertEqual(ids, [self.rotunda.id, self.private.id, self.jpa.id])
+
+    # Test: bounding-box search and parameter validation
+    def test_bounding_box_search(self):
+        self.client.force_login(self.patron)
+        response = self.client.get(self.url, {'bbox': '-78.46,38.03,-78.44,38.04'})
+        self.assertEqual([p['id'] for p in response.json()['properties']], [self.pantops.id])
+        self.assertEqual(self.client.get(self.url, {'bbox': 'nope'}).status_code, 400)
+
+    # Test: non-finite, out-of-range and oversized requests are rejected rather than failing
+    def test_invalid_coordinates(self):
+        self.client.force_login(self.patron)
+        for params in (
+            {'lat': 'nan', 'lon': -78.5, 'radius': 1},
+            {'lat': 38.0, 'lon': 'inf', 'radius': 1},
+            {'lat': 38.0, 'lon': -78.5, 'radius': 'nan'},
+            {'lat': 91, 'lon': -78.5, 'radius': 1},
+            {'bbox': '-78.6,inf,-78.4,38.1'},
+            {'bbox': '-181,37.9,-78.4,38.1'},
+            {'bbox': '-80,30,-70,40'},
+        ):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+    # Test: the geohash is kept in step with the coordinates
+    def test_geohash_follows_coordinates(self):
+        self.assertEqual(self.rotunda.geohash, geohash_encode(38.0356, -78.5034))
+        self.rotunda.latitude = self.rotunda.longitude = None
+        self.rotunda.save()
+        self.assertEqual(self.rotunda.geohash, '')
+
+
+class PropertyClusterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.patron = get_user_model().objects.create_user(
+            username='patron',
+            email='patron@example.com',
+            password='patronpass',
+            role='patron'
+        )
+        for i, (latitude, longitude) in enumerate([(38.0356, -78.5034), (38.0293, -78.5131), (38.0330, -78.4460)]):
+            Property.objects.create(
+                title=f"Property {i}", location=f"Address {i}", price=1000 + i * 100,
+                latitude=latitude, longitude=longitude, geocode_status='ok'
+            )
+        self.url = reverse('listing_service:property_clusters')
+        self.params = {'zoom': 10, 'bbox': '-78.6,37.9,-78.4,38.1'}
+
+    def cluster_counts(self):
+        return sorted(c['count'] for c in self.client.get(self.url, self.params).json()['clusters'])
+
+    # Test: malformed, non-finite and out-of-range boxes are rejected rather than failing
+    def test_invalid_bbox(self):
+        self.client.force_login(self.patron)
+        for bbox in ('nope', '-78.6,nan,-78.4,38.1', '-78.6,37.9,inf,38.1', '-78.6,37.9,-78.4,95', '-78.4,37.9,-78.6,38.1'):
+            self.assertEqual(self.client.get(self.url, {'zoom': 10, 'bbox': bbox}).status_code, 400, bbox)
+
+    # Test: properties are aggregated per grid cell with count and price range
+    def test_clusters_aggregate_per_cell(self):
+        self.client.force_login(self.patron)
+        clusters = self.client.get(self.url, self.params).json()['clusters']
+        self.assertEqual(sum(c['count'] for c in clusters), 3)
+        biggest = max(clusters, key=lambda c: c['count'])
+        self.assertEqual((biggest['min_price'], biggest['max_price']), ('1000.00', '1100.00'))
+
+    # Test: cached aggregates are dropped when a property changes
+    def test_clusters_invalidate_on_property_change(self):
+        self.client.force_login(self.patron)
+        self.assertEqual(sum(self.cluster_counts()), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            Property.objects.create(
+                title="New", location="New", price=900,
+                latitude=38.0300, longitude=-78.5000, geocode_status='ok'
+            )
+        self.assertEqual(sum(self.cluster_counts()), 4)
+
+
+class RegionClassificationTests(TestCase):
+    # Test: region comes from the polygons and proximity from the distance to Grounds
+    def test_classify_batch(self):
+        regions, proximities = classify(
+            [38.0356, 38.0330, 37.9000],
+            [-78.5034, -78.4460, -78.5000]
+        )
+        self.assertEqual(list(regions), ['central_grounds', 'pantops', ''])
+        self.assertEqual(list(proximities), ['on_grounds', 'albemarle', 'albemarle'])
+
+    # Test: saving a geocoded property classifies it
+    def test_classified_on_save(self):
+        property_obj = Property.objects.create(
+            title="Downtown", location="Downtown", price=1000,
+            latitude=38.0310, longitude=-78.4790, geocode_status='ok'
+        )
+        self.assertEqual(property_obj.region, 'downtown_mall')
+        self.assertEqual(property_obj.proximity, '1_to_2_mi')
+
+    # Test: a librarian's region and proximity survive saves until the coordinates change
+    def test_chosen_fields_kept_until_moved(self):
+        property_obj = Property.objects.create(
+            title="Downtown", location="Downtown", price=1000,
+            latitude=38.0310, longitude=-78.4790, geocode_status='ok',
+            region='pantops', proximity='albemarle'
+        )
+        property_obj = Property.objects.get(id=property_obj.id)
+        property_obj.price = 1100
+        property_obj.save()
+        property_obj.refresh_from_db()
+        self.assertEqual((property_obj.region, property_obj.proximity), ('pantops', 'albemarle'))
+
+        property_obj.latitude, property_obj.longitude = 38.0356, -78.5034
+        property_obj.save()
+        property_obj.refresh_from_db()
+        self.assertEqual((property_obj.region, property_obj.proximity), ('central_grounds', 'on_grounds'))
+
+    # Test: adding a geocoded property keeps the region picked in the form
+    @mock.patch('listing_service.geocoding.geocode_address', return_value={'lat': 38.0310, 'lon': -78.4790})
+    def test_add_property_keeps_chosen_region(self, geocode):
+        librarian = get_user_model().objects.create_user(
+            username='librarian', email='librarian@example.com', password='librarianpass', role='librarian'
+        )
+        self.client.force_login(librarian)
+        self.client.post(reverse('listing_service:add_property'), {
+            'title': 'Chosen', 'property_type': 'Apartment', 'description': 'Flat',
+            'location': '100 Main St', 'price': 1000, 'region': 'pantops',
+        })
+        property_obj = Property.objects.get(title='Chosen')
+        self.assertEqual((property_obj.region, property_obj.proximity), ('pantops', '1_to_2_mi'))
+
+    # Test: the bulk command fixes hand-entered values and keeps unmatched regions
+    def test_bulk_command(self):
+        wrong = Property.objects.create(
+            title="Wrong", location="Wrong", price=1000,
+            latitude=38.0356, longitude=-78.5034, geocode_status='ok'
+        )
+        outside = Property.objects.create(
+            title="Outside", location="Outside", price=1000,
+            latitude=37.9000, longitude=-78.5000, geocode_status='ok'
+        )
+        Property.objects.filter(id=wrong.id).update(region='pantops', proximity='albemarle')
+        Property.objects.filter(id=outside.id).update(region='frys_spring')
+
+        call_command('classify_properties', stdout=StringIO())
+        wrong.refresh_from_db()
+        outside.refresh_from_db()
+        self.assertEqual((wrong.region, wrong.proximity), ('central_grounds', 'on_grounds'))
+        self.assertEqual((outside.region, outside.proximity), ('frys_spring', 'albemarle'))
+
+
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.librarian = get_user_model().objects.create_user(
+            username='librarian',
+            email='librarian@example.com',
+            password='librarianpass',
+            role='librarian'
+        )
+        self.in_description = Property.objects.create(
+            title="Quiet Studio", description="Short walk to Jefferson Park", location="10 Elm St", price=800
+        )
+        self.in_title = Property.objects.create(
+            title="Jefferson Park Apartments", description="Two bedrooms", location="1815 JPA", price=1200
+        )
+        Property.objects.create(title="Pantops Condo", description="Mountain view", location="Pantops", price=1500)
+        self.url = reverse('listing_service:property_listing')
+
+    def listed_ids(self, **params):
+        self.client.force_login(self.librarian)
+        return [p.id for p in self.client.get(self.url, params).context['properties']]
+
+    # Test: matches are ranked by relevance, title hits first, prefixes allowed
+    def test_ranked_by_relevance(self):
+        self.assertEqual(self.listed_ids(q='jeff park'), [self.in_title.id, self.in_description.id])
+
+    # Test: an explicit sort still applies to the matches
+    def test_explicit_sort(self):
+        self.assertEqual(self.listed_ids(q='jefferson', sort='price'), [self.in_description.id, self.in_title.id])
+
+    # Test: the index follows edits and deletes
+    def test_index_kept_in_sync(self):
+        self.in_title.title = "Rugby Road House"
+        self.in_title.description = "Porch"
+        self.in_title.location = "Rugby Rd"
+        self.in_title.save()
+        self.in_description.delete()
+
+        self.assertEqual(self.listed_ids(q='jefferson'), [])
+        self.assertEqual(self.listed_ids(q='rugby'), [self.in_title.id])
+
+
+class FuzzySearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.librarian = get_user_model().objects.create_user(
+            username='librarian',
+            email='librarian@example.com',
+            password='librarianpass',
+            role='librarian'
+        )
+        self.jpa = Property.objects.create(
+            title="Jefferson Park Apartments", description="Two bedrooms", location="1815 Jefferson Park Ave", price=1200
+        )
+        self.rugby = Property.objects.create(
+            title="Rugby Road House", description="Porch", location="300 Rugby Rd", price=900
+        )
+        Property.objects.create(title="Pantops Condo", description="Mountain view", location="Pantops", price=1500)
+        self.client.force_login(self.librarian)
+
+    # Test: misspelled listing searches fall back to trigram matches
+    def test_listing_misspelling(self):
+        response = self.client.get(reverse('listing_service:property_listing'), {'q': 'Jeferson Park'})
+        self.assertEqual([p.id for p in response.context['properties']], [self.jpa.id])
+
+    # Test: the title search endpoint tolerates typos too
+    def test_search_properties_misspelling(self):
+        response = self.client.get(reverse('listing_service:search_properties'), {'q': 'Rugbey'})
+        self.assertEqual([p['id'] for p in response.json()['properties']], [self.rugby.id])
+
+    # Test: unrelated queries stay empty
+    def test_below_threshold(self):
+        response = self.client.get(reverse('listing_service:search_properties'), {'q': 'xyzzy'})
+        self.assertEqual(response.json()['properties'], [])
+
+    # Test: the in-process index picks up new properties
+    def test_index_rebuilt_after_change(self):
+        self.client.get(reverse('listing_service:search_properties'), {'q': 'Rugbey'})
+        with self.captureOnCommitCallbacks(execute=True):
+            added = Property.objects.create(title="Rugbey Lofts", description="", location="1 Rugby Rd", price=1000)
+        response = self.client.get(reverse('listing_service:search_properties'), {'q': 'Rugbi Lofts'})
+        self.assertEqual(response.json()['properties'][0]['id'], added.id)
+
+
+    # Test: hidden properties can't crowd visible ones out of the fuzzy limit
+    @override_settings(FUZZY_SEARCH_LIMIT=1)
+    def test_limit_applies_after_visibility(self):
+        patron = get_user_model().objects.create_user(
+            username='patron', email='patron@example.com', password='patronpass', role='patron'
+        )
+        private = Collection.objects.create(title="Private", private=True, owner=self.librarian)
+        Property.objects.create(
+            title="Rugbey Lofts", description="", location="1 Rugbey Rd", price=1000, private_collection=private
+        )
+        self.client.force_login(patron)
+        response = self.client.get(reverse('listing_service:search_properties'), {'q': 'Rugbey'})
+        self.assertEqual([p['id'] for p in response.json()['properties']], [self.rugby.id])
+
+class TypeaheadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.patron = get_user_model().objects.create_user(
+            username='patron',
+            email='patron@example.com',
+            password='patronpass',
+            role='patron'
+        )
+        self.librarian = get_user_model().objects.create_user(
+            username='librarian',
+            email='librarian@example.com',
+            password='librarianpass',
+            role='librarian'
+        )
+        self.jpa = Property.objects.create(title="Jefferson Park Apartments", location="JPA", price=1200)
+        self.park = Property.objects.create(title="Park Place", location="Main St", price=900)
+        self.private = Collection.objects.create(title="Private", private=True, owner=self.librarian)
+        self.hidden = Property.objects.create(
+            title="Parkside Lofts", location="Grady Ave", price=1100, private_collection=self.private
+        )
+        self.private.properties.add(self.hidden)
+        self.url = reverse('listing_service:search_properties')
+
+    def titles(self, user, **params):
+        self.client.force_login(user)
+        return [p['title'] for p in self.client.get(self.url, params).json()['properties']]
+
+    # Test: matches any word prefix, title starts first, skipping properties in private collections
+    def test_word_prefix(self):
+        self.assertEqual(self.titles(self.patron, q='park'), ["Park Place", "Jefferson Park Apartments"])
+
+    # Test: librarians also see properties in private collections
+    def test_librarian_sees_private(self):
+        self.assertEqual(
+            self.titles(self.librarian, q='park'),
+            ["Park Place", "Parkside Lofts", "Jefferson Park Apartments"],
+        )
+
+    # Test: only the top matches come back
+    def test_limit(self):
+        self.assertEqual(self.titles(self.patron, q='park', limit=1), ["Park Place"])
+
+    # Test: no query lists every visible title
+    def test_view_all(self):
+        self.assertEqual(self.titles(self.patron), ["Jefferson Park Apartments", "Park Place"])
+
+    # Test: the index follows privacy changes and edits
+    def test_invalidated_on_change(self):
+        self.titles(self.patron, q='park')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.private.private = False
+            self.private.save()
+            self.park.title = "Rugby Place"
+            self.park.save()
+        self.assertEqual(self.titles(self.patron, q='park'), ["Parkside Lofts", "Jefferson Park Apartments"])
+
+
+@override_settings(LISTING_PAGE_SIZE=2)
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.librarian = get_user_model().objects.create_user(
+            username='librarian',
+            email='librarian@example.com',
+            password='librarianpass',
+            role='librarian'
+        )
+        self.client.force_login(self.librarian)
+        # two price ties so the id tiebreaker matters
+        for title, price in (("Alpha", 900), ("Bravo", 700), ("Charlie", 900), ("Delta", 700), ("Echo", 1200)):
+            Property.objects.create(title=title, location="Main St", price=price)
+        self.url = reverse('listing_service:property_listing')
+
+    def walk(self, url, key, **params):
+        """Follow next-page links, returning each page's titles."""
+        pages = []
+        while True:
+            response = self.client.get(url, params)
+            pages.append([item.title for item in response.context[key]])
+            next_page_url = response.context['next_page_url']
+            if not next_page_url:
+                return pages
+            params['cursor'] = parse_qs(urlparse(next_page_url).query)['cursor'][0]
+
+    # Test: pages cover every row once, in order, for each sort
+    def test_walks_every_sort(self):
+        self.assertEqual(self.walk(self.url, 'properties', sort='price'),
+                         [["Bravo", "Delta"], ["Alpha", "Charlie"], ["Echo"]])
+        self.assertEqual(self.walk(self.url, 'properties', sort='-price'),
+                         [["Echo", "Charlie"], ["Alpha", "Delta"], ["Bravo"]])
+        self.assertEqual(self.walk(self.url, 'properties', sort='title'),
+                         [["Alpha", "Bravo"], ["Charlie", "Delta"], ["Echo"]])
+        self.assertEqual(self.walk(self.url, 'properties'),
+                         [["Echo", "Delta"], ["Charlie", "Bravo"], ["Alpha"]])
+
+    # Test: relevance ordering pages too
+    def test_relevance(self):
+        pages = self.walk(self.url, 'properties', q='main')
+        self.assertEqual(sorted(sum(pages, [])), ["Alpha", "Bravo", "Charlie", "Delta", "Echo"])
+
+    # Test: a tampered cursor starts over from the first page
+    def test_tampered_cursor(self):
+        response = self.client.get(self.url, {'sort': 'title', 'cursor': 'not-a-cursor'})
+        self.assertEqual([p.title for p in response.context['properties']], ["Alpha", "Bravo"])
+
+    # Test: a later page is the same single query as the first
+    def test_constant_queries(self):
+        with self.assertNumQueries(1):
+            rows, cursor = keyset_page(Property.objects.all(), ('title', 'id'), None, 2)
+        with self.assertNumQueries(1):
+            rows, cursor = keyset_page(Property.objects.all(), ('title', 'id'), cursor, 2)
+        self.assertEqual([p.title for p in rows], ["Charlie", "Delta"])
+
+    # Test: collection listings page the same way
+    def test_collection_listing(self):
+        for title in ("One", "Two", "Three"):
+            Collection.objects.create(title=title, description="", owner=self.librarian)
+        url = reverse('listing_service:collection_listing')
+        self.assertEqual(self.walk(url, 'collections', sort='title'), [["One", "Three"], ["Two"]])
+        url = reverse('listing_service:my_collections')
+        self.assertEqual(self.walk(url, 'collections', sort='-title'), [["Two", "Three"], ["One"]])
+
+
+class RatingAggregateTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.patron = get_user_model().objects.create_user(
+            username='patron',
+            email='patron@example.com',
+            password='patronpass',
+            role='patron'
+        )
+        self.property = Property.objects.create(title="Rugby Road House", location="Rugby Rd", price=900)
+        self.client.force_login(self.patron)
+
+    def stored(self):
+        return Property.objects.values(
+            'rating_sum', 'review_count', 'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5'
+        ).get(id=self.property.id)
+
+    # Test: adding, editing and deleting a review keep the aggregates in step
+    def test_review_lifecycle(self):
+        self.client.post(reverse('review_service:add_review', args=[self.property.id]), {'content': 'ok', 'rating': '4.5'})
+        self.assertEqual(self.stored(), {
+            'rating_sum': 4.5, 'review_count': 1, 'stars_1': 0, 'stars_2': 0, 'stars_3': 0, 'stars_4': 1, 'stars_5': 0,
+        })
+
+        review = Review.objects.get(property=self.property)
+        self.client.post(reverse('review_service:edit_review', args=[review.id]), {'content': 'meh', 'rating': '2.0'})
+        self.assertEqual(self.stored(), {
+            'rating_sum': 2, 'review_count': 1, 'stars_1': 0, 'stars_2': 1, 'stars_3': 0, 'stars_4': 0, 'stars_5': 0,
+        })
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.average_rating, 2)
+
+        self.client.post(reverse('review_service:delete_review', args=[review.id]))
+        self.assertEqual(self.stored()['review_count'], 0)
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.average_rating, "N/A")
+
+    # Test: the rebuild command recomputes drifted aggregates
+    def test_rebuild_ratings(self):
+        Review.objects.create(user=self.patron, property=self.property, content="", rating=5)
+        out = StringIO()
+        call_command('rebuild_ratings', stdout=out)
+        self.assertIn("Fixed ratings on 1 of 1", out.getvalue())
+        self.assertEqual(self.stored(), {
+            'rating_sum': 5, 'review_count': 1, 'stars_1': 0, 'stars_2': 0, 'stars_3': 0, 'stars_4': 0, 'stars_5': 1,
+        })
+
+    # Test: listing pages read stored ratings without touching reviews
+    def test_listing_skips_reviews(self):
+        Property.record_rating(self.property.id, added=3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('listing_service:property_listing'))
+        self.assertContains(response, "(1)")
+        self.assertFalse(any('review_service_review' in query['sql'] for query in queries.captured_queries))
+
+
+class FacetCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.librarian = get_user_model().objects.create_user(
+            username='librarian',
+            email='librarian@example.com',
+            password='librarianpass',
+            role='librarian'
+        )
+        self.client.force_login(self.librarian)
+        Property.objects.create(title="JPA Flat", property_type="Apartment", region="jpa", location="JPA", price=750)
+        Property.objects.create(title="JPA Room", property_type="Room", region="jpa", location="JPA", price=900)
+        Property.objects.create(title="Pantops House", property_type="House", region="pantops",
+                                location="Pantops", price=1800, status="leased")
+        self.url = reverse('listing_service:property_listing')
+
+    # Test: every facet is counted in one query
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            counts = facet_counts(Property.objects.all(), {})
+        self.assertEqual(counts['types']['Apartment'], 1)
+        self.assertEqual(counts['regions']['jpa'], 2)
+        self.assertEqual(counts['statuses'], {'available': 2, 'leased': 1})
+        self.assertEqual(counts['prices'], {'under_800': 1, '800_1200': 1, '1200_1600': 0, '1600_up': 1})
+
+    # Test: a facet's own selection doesn't narrow its counts, other selections do
+    def test_selected_facets(self):
+        counts = self.client.get(self.url, {'regions': 'jpa'}).context['facet_counts']
+        self.assertEqual(counts['regions']['pantops'], 1)
+        self.assertEqual(counts['types'], {'Apartment': 1, 'Condo': 0, 'Room': 1, 'House': 0, 'Other': 0})
+
+    # Test: unfiltered counts are served from cache until a property changes
+    def test_unfiltered_counts_cached(self):
+        self.client.get(self.url)
+        with mock.patch('listing_service.facets.facet_counts') as counted:
+            self.client.get(self.url)
+            counted.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                Property.objects.create(title="New", property_type="Condo", location="Main St", price=1000)
+            counted.return_value = {facet: {} for facet in FACETS}
+            self.client.get(self.url)
+            counted.assert_called_once()
+
+    # Test: status and price filters narrow the listing
+    def test_status_and_price_filters(self):
+        response = self.client.get(self.url, {'statuses': 'available', 'prices': '800_1200'})
+        self.assertEqual([p.title for p in response.context['properties']], ["JPA Room"])
+
+
+class VisibilityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.librarian = get_user_model().objects.create_user(
+            username='librarian',
+            email='librarian@example.com',
+            password='librarianpass',
+            role='librarian'
+        )
+        self.patron = get_user_model().objects.create_user(
+            username='patron',
+            email='patron@example.com',
+            password='patronpass',
+            role='patron'
+        )
+        self.collection = Collection.objects.create(title="Private", private=True, owner=self.librarian)
+        self.property = Property.objects.create(
+            title="Hidden House", location="Main St", price=900, private_collection=self.collection
+        )
+
+    def listed(self):
+        self.client.force_login(self.patron)
+        return [p.title for p in self.client.get(reverse('listing_service:property_listing')).context['properties']]
+
+    # Test: the hidden set is cached per user
+    def test_cached(self):
+        hidden_collection_ids(self.patron)
+        with self.assertNumQueries(0):
+            self.assertEqual(hidden_collection_ids(self.patron), {self.collection.id})
+
+    # Test: approval and revocation take effect on the next request
+    def test_access_changes(self):
+        self.assertEqual(self.listed(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            access = CollectionAccess.objects.create(collection=self.collection, user=self.patron, status='approved')
+        self.assertEqual(self.listed(), ["Hidden House"])
+
+        self.client.force_login(self.librarian)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('listing_service:revoke_collection_access', args=[self.collection.id, self.patron.id]))
+        access.refresh_from_db()
+        self.assertEqual(access.status, 'denied')
+        self.assertEqual(self.listed(), [])
+
+    # Test: making the collection public shows its properties everywhere
+    def test_privacy_flip(self):
+        self.assertEqual(self.listed(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.collection.private = False
+            self.collection.save()
+        self.assertEqual(self.listed(), ["Hidden House"])
+        response = self.client.get(reverse('listing_service:search_properties'), {'q': 'hidden'})
+        self.assertEqual([p['title'] for p in response.json()['properties']], ["Hidden House"])
+
+    # Test: details and typeahead follow the same rule
+    def test_details_and_search(self):
+        self.client.force_login(self.patron)
+        response = self.client.get(reverse('listing_service:property_details', args=[self.property.id]))
+        self.assertEqual(response.status_code, 302)
+        response = self.client.get(reverse('listing_service:search_properties'), {'q': 'hidden'})
+        self.assertEqual(response.json()['properties'], [])
+
+
+class ListingResultCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.librarian = get_user_model().objects.create_user(
+            username='librarian',
+            email='librarian@example.com',
+            password='librarianpass',
+            role='librarian'
+        )
+        self.patron = get_user_model().objects.create_user(
+            username='patron',
+            email='patron@example.com',
+            password='patronpass',
+            role='patron'
+        )
+        self.property = Property.objects.create(title="JPA Flat", property_type="Apartment", location="JPA", price=750)
+        self.url = reverse('listing_service:property_listing')
+        self.client.force_login(self.librarian)
+
+    def titles(self, **params):
+        return [p.title for p in self.client.get(self.url, params).context['properties']]
+
+    # Test: a repeated listing is served without querying properties
+    def test_repeat_served_from_cache(self):
+        self.client.get(self.url, {'types': 'all', 'sort': '-id'})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'sort': '-id', 'types': 'all'})
+        self.assertContains(response, "JPA Flat")
+        self.assertFalse(any('listing_service_property' in query['sql'] for query in queries.captured_queries))
+
+    # Test: property and review writes invalidate cached pages
+    def test_invalidation(self):
+        self.assertEqual(self.titles(), ["JPA Flat"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.property.title = "JPA Loft"
+            self.property.save()
+        self.assertEqual(self.titles(), ["JPA Loft"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(user=self.patron, property=self.property, content="", rating=4)
+            Property.record_rating(self.property.id, added=4)
+        self.assertContains(self.client.get(self.url), "(1)")
+
+    # Test: users who see different properties get different cache entries
+    def test_keyed_by_visibility(self):
+        collection = Collection.objects.create(title="Private", private=True, owner=self.librarian)
+        Property.objects.create(title="Hidden House", location="Main St", price=900, private_collection=collection)
+        self.assertEqual(self.titles(), ["Hidden House", "JPA Flat"])
+        self.client.force_login(self.patron)
+        self.assertEqual(self.titles(), ["JPA Flat"])
+
+
+class PropertyCardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.librarian = get_user_model().objects.create_user(
+            username='librarian',
+            email='librarian@example.com',
+            password='librarianpass',
+            role='librarian'
+        )
+        self.client.force_login(self.librarian)
+        self.property = Property.objects.create(title="JPA Flat", location="JPA", price=750)
+        self.url = reverse('listing_service:property_listing')
+
+    # Test: saves and rating changes bump the card version
+    def test_version_bumped(self):
+        self.assertEqual(self.property.version, 1)
+        self.property.status = 'leased'
+        self.property.save()
+        self.assertEqual(self.property.version, 2)
+        Property.record_rating(self.property.id, added=5)
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.version, 3)
+
+    # Test: saving a stale copy keeps a rating recorded since it was loaded, and never reuses a version
+    def test_save_keeps_concurrent_rating(self):
+        stale = Property.objects.get(id=self.property.id)
+        Property.record_rating(self.property.id, added=4)
+        stale.description = "Edited"
+        stale.save()
+        self.assertEqual(stale.version, 3)
+        self.property.refresh_from_db()
+        self.assertEqual((self.property.review_count, self.property.rating_sum, self.property.stars_4), (1, 4, 1))
+        self.assertEqual((self.property.description, self.property.version), ("Edited", 3))
+
+    # Test: a save inside a transaction stales cached pages only once it commits
+    def test_bump_waits_for_commit(self):
+        before = get_version('listing')
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.property.save()
+                self.assertEqual(get_version('listing'), before)
+        self.assertNotEqual(get_version('listing'), before)
+
+    # Test: a cached card is reused until its property changes
+    def test_card_cached_by_version(self):
+        self.client.get(self.url)
+        # a changed row with the same version still renders the cached card
+        Property.objects.filter(id=self.property.id).update(description="Changed behind the cache")
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_version('listing')
+        self.assertNotContains(self.client.get(self.url), "Changed behind")
+
+        self.property.refresh_from_db()
+        self.property.description = "Sunny corner unit"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.property.save()
+        self.assertContains(self.client.get(self.url), "Sunny corner unit")
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.librarian = get_user_model().objects.create_user(
+            username='librarian',
+            email='librarian@example.com',
+            password='librarianpass',
+            role='librarian'
+        )
+        self.patron = get_user_model().objects.create_user(
+            username='patron',
+            email='patron@example.com',
+            password='patronpass',
+            role='patron'
+        )
+        self.property = Property.objects.create(
+            title="JPA Flat", location="JPA", price=750, geocode_status='failed'
+        )
+        self.listing_url = reverse('listing_service:property_listing')
+        self.details_url = reverse('listing_service:property_details', args=[self.property.id])
+        self.client.force_login(self.patron)
+
+    # Test: unchanged pages answer 304 and are private to the viewer
+    def test_not_modified(self):
+        for url in (self.listing_url, self.details_url, reverse('listing_service:collection_listing')):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('private', response['Cache-Control'])
+            self.assertIn('Cookie', response['Vary'])
+            repeat = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(repeat.status_code, 304)
+
+    # Test: edits and reviews change the validators
+    def test_changes_invalidate(self):
+        listing_etag = self.client.get(self.listing_url)['ETag']
+        details_etag = self.client.get(self.details_url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(user=self.librarian, property=self.property, content="Great", rating=5)
+        self.assertEqual(self.client.get(self.details_url, HTTP_IF_NONE_MATCH=details_etag).status_code, 200)
+
+        self.property.title = "JPA Loft"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.property.save()
+        self.assertEqual(self.client.get(self.listing_url, HTTP_IF_NONE_MATCH=listing_etag).status_code, 200)
+
+    # Test: another user never matches this user's validator
+    def test_per_user(self):
+        etag = self.client.get(self.listing_url)['ETag']
+        self.client.force_login(self.librarian)
+        self.assertEqual(self.client.get(self.listing_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    # Test: pending flash messages are rendered rather than hidden behind a 304
+    def test_pending_messages(self):
+        collection = Collection.objects.create(title="Private", private=True, owner=self.librarian)
+        hidden = Property.objects.create(title="Hidden", location="Main St", price=900, private_collection=collection)
+        etag = self.client.get(self.listing_url)['ETag']
+        # bounced from a private property with an error message
+        self.client.get(reverse('listing_service:property_details', args=[hidden.id]))
+        response = self.client.get(self.listing_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class CollectionListingQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.librarian = get_user_model().objects.create_user(
+            username='librarian',
+            email='librarian@example.com',
+            password='librarianpass',
+            role='librarian'
+        )
+        self.patron = get_user_model().objects.create_user(
+            username='patron',
+            email='patron@example.com',
+            password='patronpass',
+            role='patron'
+        )
+        self.property = Property.objects.create(title="JPA Flat", location="JPA", price=750)
+        self.client.force_login(self.patron)
+
+    def add_collections(self, count):
+        for index in range(count):
+            owner = self.patron if index % 4 == 3 else self.librarian
+            collection = Collection.objects.create(title=f"Collection {index}", private=index % 2 == 0, owner=owner)
+            CollectionProperty.objects.create(collection=collection, property=self.property, hidden=index % 3 == 0)
+            if index % 4 == 0:
+                CollectionAccess.objects.create(collection=collection, user=self.patron, status='approved')
+            elif index % 4 == 2:
+                CollectionAccess.objects.create(collection=collection, user=self.patron)
+
+    def page_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    # Test: the page costs the same number of queries for N and 2N collections
+    def test_constant_queries(self):
+        for url in (reverse('listing_service:collection_listing'), reverse('listing_service:my_collections')):
+            Collection.objects.all().delete()
+            self.add_collections(4)
+            few = self.page_queries(url)
+            self.add_collections(4)
+            self.assertEqual(self.page_queries(url), few)
+
+    # Test: annotations match the per-row model checks they replace
+    def test_flags(self):
+        self.add_collections(8)
+        response = self.client.get(reverse('listing_service:collection_listing'))
+        for collection in response.context['collections']:
+            self.assertEqual(collection.has_visible, collection.has_visible_properties())
+            self.assertEqual(collection.has_requested, collection.user_has_requested_access(self.patron))
+            if collection.private and collection.owner_id != self.patron.id:
+                self.assertEqual(collection.has_access, collection.user_has_access(self.patron))
+
+
+class CollectionSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username='patron',
+            email='patron@example.com',
+            password='patronpass',
+            role='patron'
+        )
+        self.collection = Collection.objects.create(title="Near Grounds", owner=self.user)
+        self.cheap = Property.objects.create(title="JPA Flat", location="JPA", price=700)
+        self.dear = Property.objects.create(title="Corner Loft", location="Elliewood", price=1300, status='leased')
+        self.hidden = Property.objects.create(title="Hidden", location="Main St", price=5000)
+        for property_obj in (self.cheap, self.dear):
+            CollectionProperty.objects.create(collection=self.collection, property=property_obj)
+        CollectionProperty.objects.create(collection=self.collection, property=self.hidden, hidden=True)
+
+    # Test: the summary covers visible properties only and is served from cache
+    def test_summary(self):
+        summary = get_summary(self.collection.id)
+        self.assertEqual(summary['property_count'], 2)
+        self.assertEqual((summary['min_price'], summary['max_price'], summary['avg_price']), (700, 1300, 1000))
+        self.assertEqual((summary['available_count'], summary['leased_count']), (1, 1))
+        self.assertEqual(summary['average_rating'], "N/A")
+        with self.assertNumQueries(0):
+            get_summary(self.collection.id)
+
+    # Test: property, membership and review changes drop the cached summary
+    def test_invalidation(self):
+        get_summary(self.collection.id)
+        self.cheap.price = 900
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cheap.save()
+        self.assertEqual(get_summary(self.collection.id)['min_price'], 900)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CollectionProperty.objects.filter(property=self.dear).delete()
+        self.assertEqual(get_summary(self.collection.id)['property_count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Property.record_rating(self.cheap.id, added=4)
+            Review.objects.create(user=self.user, property=self.cheap, content="Quiet", rating=4)
+        self.assertEqual(get_summary(self.collection.id)['average_rating'], 4)
+
+    # Test: listing cards carry their collection's summary, empty collections included
+    def test_listing_summaries(self):
+        empty = Collection.objects.create(title="Empty", owner=self.user)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('listing_service:collection_listing'))
+        summaries = {collection.id: collection.summary for collection in response.context['collections']}
+        self.assertEqual(summaries[self.collection.id]['property_count'], 2)
+        self.assertEqual(summaries[empty.id]['property_count'], 0)
+
+
+class CollectionMembershipTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.librarian = get_user_model().objects.create_user(
+            username='librarian',
+            email='librarian@example.com',
+            password='librarianpass',
+            role='librarian'
+        )
+        self.public = Collection.objects.create(title="Public", owner=self.librarian)
+        self.other_private = Collection.objects.create(title="Other", private=True, owner=self.librarian)
+        self.properties = [
+            Property.objects.create(title=f"Flat {index}", location="JPA", price=700 + index)
+            for index in range(10)
+        ]
+        self.taken = Property.objects.create(
+            title="Taken", location="Main St", price=900, private_collection=self.other_private
+        )
+        for property_obj in self.properties:
+            CollectionProperty.objects.create(collection=self.public, property=property_obj)
+        self.client.force_login(self.librarian)
+
+    def edit(self, collection, properties, private):
+        data = {
+            'title': collection.title,
+            'description': "",
+            'properties': [property_obj.id for property_obj in properties],
+        }
+        if private:
+            data['private'] = 'on'
+        return self.client.post(reverse('listing_service:edit_collection', args=[collection.id]), data)
+
+    # Test: creating a private collection claims its properties and reports conflicts
+    def test_create_private(self):
+        data = {
+            'title': "Mine",
+            'description': "",
+            'private': 'on',
+            'properties': [self.properties[0].id, self.taken.id],
+        }
+        response = self.client.post(reverse('listing_service:create_collection'), data, follow=True)
+        collection = Collection.objects.get(title="Mine")
+        self.assertEqual(list(collection.properties.all()), [self.properties[0]])
+        self.properties[0].refresh_from_db()
+        self.assertEqual(self.properties[0].private_collection, collection)
+        self.assertTrue(CollectionProperty.objects.get(collection=self.public, property=self.properties[0]).hidden)
+        self.assertIn("Property 'Taken' is already in a private collection",
+                      [str(message) for message in response.context['messages']])
+
+    # Test: flipping to private and back hides and then restores members elsewhere
+    def test_privacy_flip(self):
+        collection = Collection.objects.create(title="Flip", owner=self.librarian)
+        self.edit(collection, self.properties[:3], private=True)
+        self.assertEqual(Property.objects.filter(private_collection=collection).count(), 3)
+        self.assertEqual(CollectionProperty.objects.filter(collection=self.public, hidden=True).count(), 3)
+
+        self.edit(collection, self.properties[1:3], private=False)
+        self.assertEqual(set(collection.properties.all()), set(self.properties[1:3]))
+        self.assertFalse(Property.objects.filter(private_collection=collection).exists())
+        self.assertFalse(CollectionProperty.objects.filter(hidden=True).exists())
+
+    # Test: an edit costs the same number of queries for 5 and 10 properties
+    def test_constant_queries(self):
+        counts = []
+        for size in (5, 10):
+            collection = Collection.objects.create(title=f"Size {size}", owner=self.librarian)
+            with CaptureQueriesContext(connection) as queries:
+                self.edit(collection, self.properties[:size], private=True)
+            counts.append(len(queries))
+            collection.delete()
+        self.assertEqual(counts[0], counts[1])
+
+
+class AvailabilityFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.patron = get_user_model().objects.create_user(
+            username='patron',
+            email='patron@example.com',
+            password='patronpass',
+            role='patron'
+        )
+        self.leased = Property.objects.create(title="Leased Flat", location="JPA", price=800)
+        self.free = Property.objects.create(title="Free Flat", location="JPA", price=850)
+        Lease.objects.create(user=self.patron, property=self.leased,
+                             start_date=date(2027, 9, 1), end_date=date(2027, 12, 31))
+        self.client.force_login(self.patron)
+
+    def listed(self, **params):
+        response = self.client.get(reverse('listing_service:property_listing'), params)
+        return {property_obj.id for property_obj in response.context['properties']}
+
+    # Test: overlaps are inclusive at both ends
+    def test_overlapping(self):
+        self.assertTrue(Lease.objects.overlapping(date(2027, 8, 15), date(2027, 9, 1)).exists())
+        self.assertTrue(Lease.objects.overlapping(date(2027, 12, 31), date(2028, 5, 31)).exists())
+        self.assertFalse(Lease.objects.overlapping(date(2028, 1, 1), date(2028, 5, 31)).exists())
+
+    # Test: properties leased during the requested range are left out
+    def test_filter(self):
+        both = {self.leased.id, self.free.id}
+        self.assertEqual(self.listed(available_from='2027-08-15', available_to='2028-05-31'), {self.free.id})
+        self.assertEqual(self.listed(available_from='2028-01-01', available_to='2028-05-31'), both)
+        self.assertEqual(self.listed(available_from='2027-10-01'), {self.free.id})
+        self.assertEqual(self.listed(available_from='not a date'), both)
+
+    # Test: a new lease drops cached pages that it changes
+    def test_new_lease(self):
+        params = {'available_from': '2028-01-01', 'available_to': '2028-05-31'}
+        self.assertIn(self.free.id, self.listed(**params))
+        with self.captureOnCommitCallbacks(execute=True):
+            Lease.objects.create(user=self.patron, property=self.free,
+                                 start_date=date(2028, 1, 1), end_date=date(2028, 6, 30))
+        self.assertNotIn(self.free.id, self.listed(**params))
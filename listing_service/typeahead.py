@@ -0,0 +1,80 @@
+from bisect import bisect_left
+
+from .models import Property
+from .versions import get_version
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class TitleIndex:
+    """
+    Sorted arrays of every word-start suffix of every property title, so a
+    prefix lookup is a binary search: 'park' finds "Jefferson Park Apartments"
+    through its "park apartments" suffix. Titles that start with the query
+    are kept apart so they rank ahead of mid-title matches.
+    """
+
+    def __init__(self, rows):
+        self.titles = {}
+        self.collections = {}
+        leading, inner = [], []
+        for property_id, title, private_collection_id in rows:
+            self.titles[property_id] = title
+            if private_collection_id is not None:
+                self.collections[property_id] = private_collection_id
+            words = title.lower().split()
+            for start in range(len(words)):
+                (inner if start else leading).append((" ".join(words[start:]), property_id))
+        self.tiers = [self._sorted(leading), self._sorted(inner)]
+
+    @staticmethod
+    def _sorted(entries):
+        entries.sort()
+        return [suffix for suffix, _ in entries], [property_id for _, property_id in entries]
+
+    def __len__(self):
+        return len(self.titles)
+
+    def visible(self, property_id, hidden_collections):
+        return self.collections.get(property_id) not in hidden_collections
+
+    def search(self, query, limit=DEFAULT_LIMIT, hidden_collections=frozenset()):
+        """Up to limit (id, title) pairs with a word starting with query, title-start matches first."""
+        prefix = " ".join(query.lower().split())
+        results, seen = [], set()
+        for suffixes, ids in self.tiers:
+            position = bisect_left(suffixes, prefix)
+            while position < len(suffixes) and len(results) < limit:
+                if not suffixes[position].startswith(prefix):
+                    break
+                property_id = ids[position]
+                if property_id not in seen and self.visible(property_id, hidden_collections):
+                    seen.add(property_id)
+                    results.append((property_id, self.titles[property_id]))
+                position += 1
+        return results
+
+    def all(self, limit=None, hidden_collections=frozenset()):
+        """Every (id, title) pair in id order, for listing without a query."""
+        results = [
+            (property_id, title) for property_id, title in sorted(self.titles.items())
+            if self.visible(property_id, hidden_collections)
+        ]
+        return results[:limit] if limit else results
+
+
+_title_index = None
+_title_index_version = None
+
+
+def get_title_index():
+    """Process-wide TitleIndex, rebuilt when the properties version changes."""
+    global _title_index, _title_index_version
+
+    version = get_version('properties')
+    if _title_index is None or _title_index_version != version:
+        # each caller filters by its own hidden collections, so one index serves everyone
+        _title_index = TitleIndex(Property.objects.values_list('id', 'title', 'private_collection_id').iterator())
+        _title_index_version = version
+    return _title_index
@@ -10,6 +10,7 @@ urlpatterns = [
     path('property/<int:property_id>/edit/', views.edit_property, name="edit_property"),
     path('property/<int:property_id>/delete/', views.delete_property, name="delete_property"),
 	  path('property/<int:property_id>/walkscore/', views.get_walk_score, name='get_walk_score'),
+    path('property/<int:property_id>/occupancy/', views.property_occupancy, name='property_occupancy'),
     path('create/', views.create_collection, name="create_collection"),
     path('collections/', views.collection_listing, name="collection_listing"),
     path('collections/<int:collection_id>/', views.collection_details, name='collection_details'),
@@ -19,6 +20,8 @@ urlpatterns = [
     path('collections/request-access/<int:collection_id>/', views.request_collection_access, name='request_collection_access'),
     path('collections/manage-access-requests/', views.manage_access_requests, name='manage_access_requests'),
     path('search_properties/', views.search_properties, name='search_properties'),
+    path('search_properties/geo/', views.geo_search_properties, name='geo_search_properties'),
+    path('map/clusters/', views.property_clusters, name='property_clusters'),
     path('collections/<int:collection_id>/revoke_access/<int:user_id>/', views.revoke_collection_access, name='revoke_collection_access'),
     path('get_presigned_url/', views.get_presigned_url, name='get_presigned_url'),
 ]
\ No newline at end of file
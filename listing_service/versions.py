@@ -0,0 +1,37 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = "listing_service:version:{}"
+
+
+def get_version(name):
+    """
+    Current value of a named version counter. Cache keys that embed it go
+    stale together when the counter is bumped.
+    """
+    key = VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        # seed from the clock so a counter lost to eviction never reuses an old value
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(*names):
+    """
+    Bump the counters once the current transaction commits, or right away
+    outside one, so no reader can cache the old rows under the new version.
+    """
+    transaction.on_commit(lambda: _bump(names))
+
+
+def _bump(names):
+    for name in names:
+        key = VERSION_KEY.format(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
@@ -6,91 +6,211 @@ from notification_service.models import Notification
 from user_service.views import guest_or_login_required, not_guest
 from .models import PROXIMITY_CHOICES, REGION_CHOICES, CollectionAccess, CollectionProperty, Property, Collection
 from django.shortcuts import get_object_or_404
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderUnavailable, GeocoderTimedOut
+from .geo import (
+    GEOHASH_RANGE_END, bbox_around, covering_cells, haversine_miles, parse_bbox, parse_latitude, parse_longitude,
+    zoom_to_precision,
+)
+from .versions import get_version
+from .geocoding import geocode_fields, queue_geocode_refresh
+from .walkscore import cached_walk_score
+from .pagination import keyset_page, page_urls
+from . import availability, facets, membership, occupancy, search, summaries, typeahead
+from .conditional import conditional_page
+from .visibility import can_view, hidden_collection_ids, visible_properties, visibility_key
 from storages.backends.s3boto3 import S3Boto3Storage
 from django.core.files.base import ContentFile
 from django.conf import settings
 from django.contrib import messages
 from django.views.decorators.http import require_GET
-import requests
 from review_service.models import Review
 from leasing_service.models import Lease
-from django.db.models import Avg, Q, Case, When, Value, IntegerField, Count
-from django.db import models
+from django.db.models import Avg, Q, Case, When, Value, IntegerField, BooleanField, Count, Max, Min, Exists, OuterRef
+from django.db.models.functions import Substr
+from django.core.cache import cache
+from django.db import models, transaction
 from django.urls import reverse
 from django.contrib.auth.decorators import user_passes_test
 import boto3
 from django.http import JsonResponse
 import uuid
 import mimetypes
+import hashlib
+from datetime import date
 
 # Create your views here.
-# helper function for geocode
-def geocode_address(address):
-    try:
-        # timeout as 4 seconds and set user_agent
-        geolocator = Nominatim(user_agent="myApp", timeout=4)
-        location = geolocator.geocode(address)
-
-        if location:
-            return {
-                'lat': location.latitude,
-                'lon': location.longitude
-            }
+def sort_ordering(sort):
+    # id breaks ties so every row has a unique position for keyset pagination
+    if sort.lstrip('-') == 'id':
+        return (sort,)
+    return (sort, '-id' if sort.startswith('-') else 'id')
+
+
+def with_collection_flags(collections, user):
+    """
+    Annotate each collection with has_visible, has_access and has_requested
+    so a page of cards needs no per-row queries.
+    """
+    collections = collections.select_related('owner').annotate(
+        has_visible=Exists(CollectionProperty.objects.filter(collection=OuterRef('pk'), hidden=False)),
+    )
+    if not user.is_authenticated:
+        return collections.annotate(
+            has_access=Value(False, output_field=BooleanField()),
+            has_requested=Value(False, output_field=BooleanField()),
+        )
+    access = CollectionAccess.objects.filter(collection=OuterRef('pk'), user=user)
+    return collections.annotate(
+        has_access=Exists(access.filter(status='approved')),
+        has_requested=Exists(access.filter(status='requested')),
+    )
+
+
+# Property fields a listing card shows; cached pages store just these
+LISTING_FIELDS = (
+    'id', 'title', 'location', 'price', 'image', 'description', 'property_type',
+    'region', 'proximity', 'status', 'rating_sum', 'review_count', 'version',
+)
+
+
+def cached_listing_page(user, query, selections, ordering, cursor, available=None):
+    """
+    One page of property_listing results with its facet counts, cached under
+    the normalized filters and the user's visibility class until the listing
+    version is bumped by a property, review, lease or collection membership
+    change. available is an optional (start, end) the properties must be
+    free for.
+    """
+    query = " ".join(query.split())
+    selected = {
+        facet: sorted(values) for facet, values in selections.items()
+        if facets.selection_filter(facet, values) is not None
+    }
+    key = "listing_service:listing:" + hashlib.sha1(repr((
+        get_version('listing'), visibility_key(user), query.lower(), selected, available, ordering, cursor
+    )).encode()).hexdigest()
+
+    page = cache.get(key)
+    if page is None:
+        qs = visible_properties(user)
+        if query:
+            qs = search.find(qs, query, rank=True)
+        if available:
+            qs = availability.available_between(qs, *available)
+
+        # counts for every filter value, before this request's own selections narrow qs
+        if query or selected or available:
+            facet_counts = facets.facet_counts(qs, selections)
         else:
-            return {'lat': None, 'lon': None}
+            facet_counts = facets.unfiltered_facet_counts(qs, visibility_key(user))
+
+        qs = facets.apply_selections(qs, selections)
+        rows, next_cursor = keyset_page(qs.only(*LISTING_FIELDS), ordering, cursor, settings.LISTING_PAGE_SIZE)
+        page = {
+            'rows': [{field: getattr(row, field) for field in LISTING_FIELDS} for row in rows],
+            'next_cursor': next_cursor,
+            'facet_counts': facet_counts,
+        }
+        cache.set(key, page, settings.LISTING_CACHE_TIMEOUT)
+    return page
 
-    except (GeocoderUnavailable, GeocoderTimedOut) as e:
-        return {'lat': None, 'lon': None}
-    except Exception as e:
-        return {'lat': None, 'lon': None}
+
+def listing_validators(request):
+    return (get_version('listing'), visibility_key(request.user), request.GET.urlencode()), None
+
+
+def property_details_validators(request, property_id):
+    property_object = Property.objects.only(
+        'id', 'version', 'updated_at', 'owner_id', 'private_collection_id', 'geocode_status'
+    ).filter(id=property_id).first()
+    # missing rows 404 and pending ones queue a geocode, so both always render
+    if property_object is None or property_object.geocode_status == 'pending':
+        return None
+    reviews = Review.objects.filter(property_id=property_id).aggregate(count=Count('id'), latest=Max('updated_at'))
+    leases = Lease.objects.filter(property_id=property_id).aggregate(count=Count('id'), latest=Max('updated_at'))
+    parts = (property_object.version, can_view(request.user, property_object), reviews, leases)
+    last_modified = max(filter(None, (property_object.updated_at, reviews['latest'], leases['latest'])))
+    return parts, last_modified
+
+
+def collection_page_validators(request, collection_id=None):
+    # collection pages show membership, privacy, access state and property cards
+    return (
+        get_version('properties'), get_version('listing'), get_version('collection_access'),
+        collection_id, request.GET.urlencode(),
+    ), None
+
+
+def apply_listing_filters(qs, query, selections, rank=False):
+    # selections: {facet: checked values} from facets.selections_from()
+    if query:
+        qs = search.find(qs, query, rank=rank)
+    return facets.apply_selections(qs, selections)
+
+
+def in_geohash_cells(qs, cells):
+    # index-backed: one geohash range per cell
+    ranges = Q()
+    for cell in cells:
+        ranges |= Q(geohash__gte=cell, geohash__lt=cell + GEOHASH_RANGE_END)
+    return qs.filter(ranges)
+
+
+def in_bounding_box(qs, south, west, north, east):
+    return in_geohash_cells(qs, covering_cells(south, west, north, east)).filter(
+        latitude__range=(south, north),
+        longitude__range=(west, east),
+    )
 
 
 @require_GET
 def get_walk_score(request, property_id):
     try:
         property_object = get_object_or_404(Property, id=property_id)
-        location = geocode_address(property_object.location)
 
-        if not location['lat'] or not location['lon']:
+        if not property_object.has_coordinates:
+            if property_object.geocode_status == 'pending':
+                queue_geocode_refresh(property_object.id)
             return JsonResponse({'error': 'Location could not be geocoded'}, status=400)
 
-        latitude, longitude = location['lat'], location['lon']
-
-        base_url = "https://api.walkscore.com/score"
-        params = {
-            'format': 'json',
-            'lat': latitude,
-            'lon': longitude,
-            'address': property_object.location,
-            'transit': '1',
-            'bike': '1',
-            'wsapikey': settings.WALKSCORE_API_KEY
-        }
+        score = cached_walk_score(property_object)
+        if score.error:
+            return JsonResponse({'error': score.error}, status=500)
 
-        try:
-            # Make API request
-            response = requests.get(base_url, params=params, timeout=5)
-            response.raise_for_status()
-            data = response.json()
-
-            # get the walk, bike, transit scores
-            walkscore = data.get('walkscore', None)
-            bikescore = data.get('bike', {}).get('score', None)
-            transitscore = data.get('transit', {}).get('score', None)
-            return JsonResponse({
-                'walkscore': walkscore,
-                'bikescore': bikescore,
-                'transitscore': transitscore,
-                'descripton': data.get('description', '')
-            })
-        except requests.exceptions.RequestException as e:
-            return JsonResponse({'error': str(e)}, status=500)
+        return JsonResponse({
+            'walkscore': score.walkscore,
+            'bikescore': score.bikescore,
+            'transitscore': score.transitscore,
+            'descripton': score.description
+        })
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
+@require_GET
+def property_occupancy(request, property_id):
+    # start=YYYY-MM and months=N; one bitmap per month, bit d - 1 set when day d is leased
+    property_object = get_object_or_404(Property.objects.only('id', 'owner_id', 'private_collection_id'), id=property_id)
+    if not can_view(request.user, property_object):
+        return JsonResponse({'error': 'Property not found.'}, status=404)
+
+    try:
+        start = request.GET.get('start') or date.today().strftime('%Y-%m')
+        year, month = (int(part) for part in start.split('-'))
+        first_month = date(year, month, 1)
+        months = int(request.GET.get('months', 12))
+        if not 1 <= months <= occupancy.MAX_MONTHS:
+            return JsonResponse({'error': f'months must be between 1 and {occupancy.MAX_MONTHS}.'}, status=400)
+        # the month after the window has to be a valid date too, which rules out ranges past year 9999
+        occupancy.add_months(first_month, months)
+    except ValueError:
+        return JsonResponse({'error': 'Provide start=YYYY-MM and months.'}, status=400)
+
+    return JsonResponse({
+        'start': occupancy.month_key(first_month),
+        'months': occupancy.cached_month_bitmaps(property_object.id, first_month, months),
+    })
+
+
 # Add property
 @login_required
 def add_property(request):
@@ -108,17 +228,19 @@ def add_property(request):
         image = request.FILES.get('image')
         status = request.POST.get('status', 'available')
 
+        # the librarian's region and proximity win over the geocoded ones; blank ones get classified on save
+        fields = geocode_fields(location)
+        fields.update(region=region, proximity=proximity)
         property_object = Property.objects.create(
             title=title,
             property_type=property_type,
             description=description,
             location=location,
             price=price,
-            region=region,
-            proximity=proximity,
             owner=request.user,
             image=None,
             status=status,
+            **fields,
         )
 
         if image:
@@ -144,10 +266,15 @@ def edit_property(request, property_id):
     next_url = request.GET.get('next') or request.POST.get('next')
 
     if request.method == 'POST':
+        location = request.POST['location']
+        if location != property_obj.location:
+            for field, value in geocode_fields(location).items():
+                setattr(property_obj, field, value)
+
         property_obj.title = request.POST['title']
         property_obj.property_type = request.POST['property_type']
         property_obj.description = request.POST['description']
-        property_obj.location = request.POST['location']
+        property_obj.location = location
         property_obj.price = request.POST['price']
         property_obj.region = request.POST.get('region', '')
         property_obj.proximity = request.POST.get('proximity', '')
@@ -204,40 +331,11 @@ def delete_property(request, property_id):
     return render(request, 'listing_service/property_listing.html', context)
 
 @guest_or_login_required
+@conditional_page(listing_validators)
 def property_listing(request):
     query       = request.GET.get("q", "")
-    selected_types       = request.GET.getlist("types")
-    selected_regions     = request.GET.getlist("regions")
-    selected_proximities = request.GET.getlist("proximities")
-
-    qs = Property.objects.all()
-    if request.user.role != 'librarian':
-        accessible_collections = CollectionAccess.objects.filter(
-            user=request.user,
-            status='approved'
-        ).values_list('collection_id', flat=True)
-
-        qs = qs.filter(
-            Q(private_collection__isnull=True) |
-            Q(private_collection__private=False) |  
-            Q(private_collection__id__in=accessible_collections)
-        )
-
-    if query:
-        qs = qs.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(location__icontains=query)
-        )
-    
-    if selected_types and "all" not in selected_types:
-        qs = qs.filter(property_type__in=selected_types)
-
-    if selected_regions and "all" not in selected_regions:
-        qs = qs.filter(region__in=selected_regions)
-
-    if selected_proximities and "all" not in selected_proximities:
-        qs = qs.filter(proximity__in=selected_proximities)
+    selections  = facets.selections_from(request.GET)
+    available   = availability.dates_from(request.GET)
 
     base_fields = [
       ('title', 'Alphabetical'),
@@ -245,33 +343,46 @@ def property_listing(request):
       ('id',    'Date Added'),
     ]
     sort_options = []
+    if query:
+        # best full-text matches first unless another order is picked
+        sort_options.append(('relevance', 'Relevance', ''))
     for field,label in base_fields:
         sort_options.append(( field,       label, '↑'))
         sort_options.append(( f'-{field}', label, '↓'))
 
-    sort = request.GET.get('sort', '-id')
+    sort = request.GET.get('sort', 'relevance' if query else '-id')
     allowed = [opt[0] for opt in sort_options]
-    if sort in allowed:
-        qs = qs.order_by(sort)
+    if sort == 'relevance' and query:
+        ordering = ('-search_rank', '-id')
+    elif sort in allowed:
+        ordering = sort_ordering(sort)
     else:
-        qs = qs.order_by('-id')
+        ordering = ('-id',)
 
-    properties = qs.annotate(
-        average_rating=Avg('review__rating'),
-        review_count=Count('review')
-    )
-    for p in properties:
-        p.average_rating = round(p.average_rating, 1) if p.average_rating is not None else "N/A"
+    page = cached_listing_page(request.user, query, selections, ordering, request.GET.get('cursor'), available)
+    properties = [Property(**row) for row in page['rows']]
+    next_page_url, first_page_url = page_urls(request, page['next_cursor'])
+    facet_counts = page['facet_counts']
 
     context = {
         "properties":       properties,
+        "next_page_url":    next_page_url,
+        "first_page_url":   first_page_url,
         "query":            query,
         "type_choices":     [(pt,pt) for pt,_ in Property._meta.get_field('property_type').choices],
         "region_choices":   REGION_CHOICES,
         "proximity_choices":PROXIMITY_CHOICES,
-        "selected_types":   selected_types,
-        "selected_regions": selected_regions,
-        "selected_proximities": selected_proximities,
+        "status_choices":   facets.facet_choices('statuses'),
+        "price_choices":    facets.facet_choices('prices'),
+        "selected_types":   selections['types'],
+        "selected_regions": selections['regions'],
+        "selected_proximities": selections['proximities'],
+        "selected_statuses": selections['statuses'],
+        "selected_prices":  selections['prices'],
+        "available_from":   request.GET.get('available_from', '') if available else '',
+        "available_to":     request.GET.get('available_to', '') if available else '',
+        "facet_counts":     facet_counts,
+        "card_cache_timeout": settings.PROPERTY_CARD_CACHE_TIMEOUT,
         "sort":             sort,
         "sort_options":     sort_options,
     }
@@ -279,28 +390,24 @@ def property_listing(request):
 
 
 @guest_or_login_required
+@conditional_page(property_details_validators)
 def property_details(request, property_id):
     property_object = get_object_or_404(Property, id=property_id)
 
-    if property_object.is_private:
-        allowed = False
-        if request.user.is_authenticated:
-            allowed = any([
-                request.user == property_object.owner,
-                request.user.role == 'librarian',
-                property_object.private_collection.user_has_access(request.user)
-            ])
-
-        if not allowed:
-            messages.error(request, "You don't have permission to view this private property")
-            return redirect('listing_service:property_listing')
+    if not can_view(request.user, property_object):
+        messages.error(request, "You don't have permission to view this private property")
+        return redirect('listing_service:property_listing')
 
-    location = geocode_address(property_object.location)
+    # stored geocode only; rows that were never geocoded are refreshed in the background
+    location = {'lat': property_object.latitude, 'lon': property_object.longitude}
+    geocode_pending = property_object.geocode_status == 'pending'
+    if geocode_pending:
+        queue_geocode_refresh(property_object.id)
 
     # easter egg
     is_easter = False
 
-    if not location['lat'] or not location['lon']:
+    if not geocode_pending and not property_object.has_coordinates:
         # easter egg for invalid road
         location['lat'], location['lon'] = 39.560500, -107.294140
         is_easter = True
@@ -308,17 +415,6 @@ def property_details(request, property_id):
 
     is_leased = property_object.status == 'leased'
 
-    # only need the dates, the user that requested it is irrelevant
-    # Lease object is a guarenteed lease that is APPROVED, so only need date
-    user_leases = Lease.objects.filter(property=property_object).values('start_date', 'end_date').distinct()
-    leased_dates = [
-        {"start": lease['start_date'].isoformat(),
-         "end": lease['end_date'].isoformat()}
-        for lease in user_leases
-    ]
-
-    print(leased_dates)
-
     details = {
         "id": property_object.id,
         "title": property_object.title,
@@ -334,13 +430,11 @@ def property_details(request, property_id):
         "lon": location['lon'],
         "review_range": range(1, 6),
         "is_leased": is_leased,
-        "leased_dates": leased_dates,
-        "easter": is_easter
+        "easter": is_easter,
+        "geocode_pending": geocode_pending,
     }
 
-    reviews = Review.objects.filter(property=property_object).select_related("user")
-    average_rating = reviews.aggregate(Avg("rating"))["rating__avg"]
-    average_rating = round(average_rating, 1) if average_rating else "N/A"
+    average_rating = property_object.average_rating
 
     rating_choices = [round(x * 0.5, 1) for x in range(2, 11)]
 
@@ -395,13 +489,15 @@ def create_collection(request):
         property_ids = request.POST.getlist('properties')
         image = request.FILES.get('image')
 
-        collection_object = Collection.objects.create(
-            title=title,
-            description=description,
-            private=private,
-            owner=request.user,
-            image=None
-        )
+        with transaction.atomic():
+            collection_object = Collection.objects.create(
+                title=title,
+                description=description,
+                private=private,
+                owner=request.user,
+                image=None
+            )
+            conflicts = membership.sync_members(collection_object, property_ids)
 
         if image:
             s3_storage = S3Boto3Storage()
@@ -411,28 +507,8 @@ def create_collection(request):
             collection_object.image = f"{settings.AWS_S3_CUSTOM_DOMAIN}/{saved_file_path}"
             collection_object.save()
 
-        properties = Property.objects.filter(id__in=property_ids)
-        valid_properties = []
-
-        for property in properties:
-            if private and property.private_collection:
-                messages.error(request, f"Property '{property.title}' is already in a private collection")
-                continue
-
-            valid_properties.append(property)
-
-            if private:
-                CollectionProperty.objects.filter(property=property).update(hidden=True)
-                property.private_collection = collection_object
-                property.save()
-
-            CollectionProperty.objects.create(
-                collection=collection_object,
-                property=property,
-                hidden=False
-            )
-
-        collection_object.properties.set(valid_properties)
+        for _, property_title in conflicts:
+            messages.error(request, f"Property '{property_title}' is already in a private collection")
 
         return redirect('listing_service:my_collections')
 
@@ -455,6 +531,7 @@ def create_collection(request):
     })
 
 @guest_or_login_required
+@conditional_page(collection_page_validators)
 def collection_listing(request):
     collections = Collection.objects.all()
 
@@ -472,10 +549,7 @@ def collection_listing(request):
 
     sort = request.GET.get('sort', '-id')
     allowed = [opt[0] for opt in sort_options]
-    if sort in allowed:
-        collections = collections.order_by(sort)
-    else:
-        collections = collections.order_by('-id')
+    ordering = sort_ordering(sort) if sort in allowed else ('-id',)
 
     next_url = request.get_full_path()
 
@@ -485,23 +559,24 @@ def collection_listing(request):
             Q(title__icontains=query) | Q(description__icontains=query)
         )
 
-    collection_access = {}
-    if request.user.is_authenticated:
-        for collection in collections:
-            collection_access[collection.id] = {
-                'has_access': collection.user_has_access(request.user),
-                'has_requested': collection.user_has_requested_access(request.user),
-            }
+    collections, next_cursor = keyset_page(
+        with_collection_flags(collections, request.user), ordering,
+        request.GET.get('cursor'), settings.LISTING_PAGE_SIZE
+    )
+    next_page_url, first_page_url = page_urls(request, next_cursor)
+    summaries.attach_summaries(collections)
 
     return render(request, 'listing_service/collection_listing.html', {
         'collections':      collections,
-        'collection_access':collection_access,
         'next_url':         next_url,
+        'next_page_url':    next_page_url,
+        'first_page_url':   first_page_url,
         'sort_options':     sort_options,
         'sort':             sort,
     })
 
 
+@conditional_page(collection_page_validators)
 def collection_details(request, collection_id):
     collection_object = get_object_or_404(Collection, id=collection_id)
 
@@ -515,25 +590,13 @@ def collection_details(request, collection_id):
         # get visible properties
         visible_collection_properties = collection_object.visible_properties()
 
-        property_ids = [cp.property_id for cp in visible_collection_properties]
-        properties_with_ratings = Property.objects.filter(id__in=property_ids).annotate(
-            average_rating=Avg('review__rating'),
-            review_count=models.Count('review')
-        )
-
-        property_ratings = {p.id: {'avg': p.average_rating, 'count': p.review_count} for p in properties_with_ratings}
-
-        # attach ratings to the visible properties
-        for cp in visible_collection_properties:
-            rating_data = property_ratings.get(cp.property_id, {'avg': None, 'count': 0})
-            cp.property.average_rating = round(rating_data['avg'], 1) if rating_data['avg'] is not None else "N/A"
-            cp.property.review_count = rating_data['count']
-
         return render(request, 'listing_service/collection_details.html', {
             'collection': collection_object,
+            'summary': summaries.get_summary(collection_object.id),
             'visible_properties': visible_collection_properties,
             'from_my_collections': from_my_collections,
-            'patrons_with_access': patrons_with_access
+            'patrons_with_access': patrons_with_access,
+            'card_cache_timeout': settings.PROPERTY_CARD_CACHE_TIMEOUT,
         })
 
     if collection_object.private and not collection_object.user_has_access(request.user):
@@ -543,27 +606,16 @@ def collection_details(request, collection_id):
     # get visible properties
     visible_collection_properties = collection_object.visible_properties()
 
-    property_ids = [cp.property_id for cp in visible_collection_properties]
-    properties_with_ratings = Property.objects.filter(id__in=property_ids).annotate(
-        average_rating=Avg('review__rating'),
-        review_count=models.Count('review')
-    )
-
-    property_ratings = {p.id: {'avg': p.average_rating, 'count': p.review_count} for p in properties_with_ratings}
-
-    # attach ratings to the visible properties
-    for cp in visible_collection_properties:
-        rating_data = property_ratings.get(cp.property_id, {'avg': None, 'count': 0})
-        cp.property.average_rating = round(rating_data['avg'], 1) if rating_data['avg'] is not None else "N/A"
-        cp.property.review_count = rating_data['count']
-
     return render(request, 'listing_service/collection_details.html', {
         'collection': collection_object,
+        'summary': summaries.get_summary(collection_object.id),
         'visible_properties': visible_collection_properties,
         'from_my_collections': from_my_collections,
+        'card_cache_timeout': settings.PROPERTY_CARD_CACHE_TIMEOUT,
     })
 
 @user_passes_test(not_guest)
+@conditional_page(collection_page_validators)
 def my_collections(request):
     collections = Collection.objects.filter(owner=request.user)
     
@@ -578,10 +630,7 @@ def my_collections(request):
 
     sort = request.GET.get('sort', '-id')
     allowed = [opt[0] for opt in sort_options]
-    if sort in allowed:
-        collections = collections.order_by(sort)
-    else:
-        collections = collections.order_by('-id')
+    ordering = sort_ordering(sort) if sort in allowed else ('-id',)
 
     query = request.GET.get('q')
 
@@ -594,8 +643,17 @@ def my_collections(request):
             models.Q(title__icontains=query) | models.Q(description__icontains=query)
         )
 
+    collections, next_cursor = keyset_page(
+        with_collection_flags(collections, request.user), ordering,
+        request.GET.get('cursor'), settings.LISTING_PAGE_SIZE
+    )
+    next_page_url, first_page_url = page_urls(request, next_cursor)
+    summaries.attach_summaries(collections)
+
     return render(request, 'listing_service/my_collections.html', {
         'collections': collections,
+        'next_page_url': next_page_url,
+        'first_page_url': first_page_url,
         'edit_mode': edit_mode,
         'next_url': next_url,
         'sort_options': sort_options,
@@ -693,19 +751,15 @@ def delete_collection(request, collection_id):
     if request.method == 'POST':
         collection_title = collection.title
 
-        if collection.private:
-
-            collection_properties = CollectionProperty.objects.filter(collection=collection)
-
-            for cp in collection_properties:
+        with transaction.atomic():
+            if collection.private:
+                property_ids = list(
+                    CollectionProperty.objects.filter(collection=collection).values_list('property_id', flat=True)
+                )
+                membership.release(property_ids)
+                summaries.forget_properties(property_ids)
 
-                prop = cp.property
-                prop.private_collection = None
-                prop.save()
-
-                CollectionProperty.objects.filter(property=prop).update(hidden=False)
-
-        collection.delete()
+            collection.delete()
 
         messages.success(request, f"Collection '{collection_title}' has been deleted successfully.")
         redirect_to = next_url
@@ -760,65 +814,19 @@ def edit_collection(request, collection_id):
         ):
             collection.owner = request.user
 
-        collection.save()
-
-        new_properties = Property.objects.filter(id__in=property_ids)
-
-        current_property_ids = collection.properties.values_list('id', flat=True)
-
-        properties_to_add = [p for p in new_properties if p.id not in current_property_ids]
-
-        properties_to_remove = collection.properties.exclude(id__in=property_ids)
-
         image = request.FILES.get('image')
         if image:
             s3_storage = S3Boto3Storage()
             file_name = f"collection-image/{collection.id}_{image.name}"
             saved_file_path = s3_storage.save(file_name, ContentFile(image.read()))
             collection.image = f"{settings.AWS_S3_CUSTOM_DOMAIN}/{saved_file_path}"
-            collection.save()
 
-        if not was_private and private:
-            for prop in new_properties:
-                if prop.private_collection and prop.private_collection != collection:
-                    messages.error(request, f"Property '{prop.title}' is already in another private collection.")
-                    continue
-
-                prop.private_collection = collection
-                prop.save()
-                CollectionProperty.objects.filter(property=prop).exclude(collection=collection).update(hidden=True)
-
-        elif was_private and not private:
-            for prop in collection.private_properties.all():
-                prop.private_collection = None
-                prop.save()
-                # Unhide in all collections
-                CollectionProperty.objects.filter(property=prop).update(hidden=False)
-
-        for prop in properties_to_remove:
-            CollectionProperty.objects.filter(collection=collection, property=prop).delete()
-
-            if was_private and prop.private_collection == collection:
-                prop.private_collection = None
-                prop.save()
-                # Unhide in all other collections
-                CollectionProperty.objects.filter(property=prop).update(hidden=False)
-
-        for prop in properties_to_add:
-            if private and prop.private_collection and prop.private_collection != collection:
-                messages.error(request, f"Property '{prop.title}' is already in another private collection.")
-                continue
-
-            CollectionProperty.objects.create(
-                collection=collection,
-                property=prop,
-                hidden=False
-            )
+        with transaction.atomic():
+            collection.save()
+            conflicts = membership.sync_members(collection, property_ids, was_private)
 
-            if private:
-                prop.private_collection = collection
-                prop.save()
-                CollectionProperty.objects.filter(property=prop).exclude(collection=collection).update(hidden=True)
+        for _, property_title in conflicts:
+            messages.error(request, f"Property '{property_title}' is already in another private collection.")
 
         messages.success(request, f"Collection '{collection.title}' has been updated successfully.")
 
@@ -858,26 +866,165 @@ def edit_collection(request, collection_id):
 @guest_or_login_required
 def search_properties(request):
     query = request.GET.get('q', '').strip()
+    hidden = hidden_collection_ids(request.user)
+    try:
+        limit = max(1, min(int(request.GET['limit']), typeahead.MAX_LIMIT))
+    except (KeyError, ValueError):
+        # "View all" asks without a query or limit and gets every title
+        limit = typeahead.DEFAULT_LIMIT if query else None
+
+    index = typeahead.get_title_index()
+    if not query:
+        matches = index.all(limit, hidden_collections=hidden)
+    else:
+        matches = index.search(query, limit, hidden_collections=hidden)
+        if not matches:
+            # fall back to typo-tolerant matching, closest first
+            matches = search.fuzzy_ranked(visible_properties(request.user), query) \
+                .order_by('-search_rank', 'id').values_list('id', 'title')[:limit]
 
-    qs = Property.objects.all()
+    data = {
+        "properties": [
+            {
+                "id": property_id,
+                "title": title,
+            }
+            for property_id, title in matches
+        ]
+    }
+    return JsonResponse(data)
 
-    if request.user.role != 'librarian':
-        qs = qs.exclude(collection__private=True)
+@guest_or_login_required
+@require_GET
+def geo_search_properties(request):
+    # bbox=west,south,east,north (Leaflet's toBBoxString order) or lat, lon and radius in miles
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 100)), 500))
+        if request.GET.get('bbox'):
+            west, south, east, north = parse_bbox(request.GET['bbox'])
+            radius = None
+            if request.GET.get('lat') and request.GET.get('lon'):
+                origin = (parse_latitude(request.GET['lat']), parse_longitude(request.GET['lon']))
+            else:
+                origin = ((south + north) / 2, (west + east) / 2)
+        else:
+            origin = (parse_latitude(request.GET['lat']), parse_longitude(request.GET['lon']))
+            radius = float(request.GET.get('radius', 1))
+            # `not` so nan fails too
+            if not 0 < radius <= 50:
+                raise ValueError("radius out of range")
+            south, west, north, east = bbox_around(origin[0], origin[1], radius)
+    except (KeyError, ValueError):
+        return JsonResponse(
+            {'error': 'Provide bbox=west,south,east,north or lat, lon and radius (miles, up to 50).'},
+            status=400
+        )
 
-    if query:
-        qs = qs.filter(title__icontains=query)
+    if south > north or west > east:
+        return JsonResponse({'error': 'Bounding box is empty.'}, status=400)
+    # every candidate in the box is distance-checked in Python, so keep the box map-sized
+    max_span = settings.GEO_SEARCH_MAX_BBOX_DEGREES
+    if radius is None and (north - south > max_span or east - west > max_span):
+        return JsonResponse({'error': f'Bounding box may span at most {max_span} degrees; zoom in.'}, status=400)
+
+    candidates = in_bounding_box(visible_properties(request.user), south, west, north, east) \
+        .values_list('id', 'latitude', 'longitude')
+
+    matches = []
+    for property_id, latitude, longitude in candidates:
+        distance = haversine_miles(origin[0], origin[1], latitude, longitude)
+        if radius is None or distance <= radius:
+            matches.append((distance, property_id))
+    matches.sort()
+
+    nearest = matches[:limit]
+    properties = Property.objects.in_bulk([property_id for _, property_id in nearest])
 
     data = {
+        "count": len(matches),
         "properties": [
             {
-                "id": property.id,
-                "title": property.title,
+                "id": property_id,
+                "title": properties[property_id].title,
+                "price": str(properties[property_id].price),
+                "status": properties[property_id].status,
+                "lat": properties[property_id].latitude,
+                "lon": properties[property_id].longitude,
+                "distance_mi": round(distance, 2),
+                "url": reverse('listing_service:property_details', args=[property_id]),
             }
-            for property in qs
+            for distance, property_id in nearest
         ]
     }
     return JsonResponse(data)
 
+@guest_or_login_required
+@require_GET
+def property_clusters(request):
+    # marker clusters for a map view of the property_listing results:
+    # bbox=west,south,east,north and zoom, plus the same q and facet filters
+    try:
+        zoom = int(request.GET.get('zoom', 13))
+        west, south, east, north = parse_bbox(request.GET.get('bbox', '-180,-90,180,90'))
+    except ValueError:
+        return JsonResponse({'error': 'Provide zoom and bbox=west,south,east,north.'}, status=400)
+    if south > north or west > east:
+        return JsonResponse({'error': 'Bounding box is empty.'}, status=400)
+
+    precision = zoom_to_precision(zoom)
+    # aggregates are cached per coarser tile so panning reuses most of them
+    tiles = covering_cells(south, west, north, east, max_cells=16, precision=max(1, precision - 2))
+
+    filters = (
+        request.GET.get("q", ""),
+        {facet: sorted(selected) for facet, selected in facets.selections_from(request.GET).items()},
+    )
+    key_prefix = "listing_service:clusters:" + hashlib.sha1(repr((
+        get_version('properties'), visibility_key(request.user), filters, precision
+    )).encode()).hexdigest()
+    tile_keys = {tile: f"{key_prefix}:{tile}" for tile in tiles}
+
+    cached = cache.get_many(tile_keys.values())
+    missing = [tile for tile in tiles if tile_keys[tile] not in cached]
+    if missing:
+        fresh = {tile_keys[tile]: [] for tile in missing}
+        qs = apply_listing_filters(visible_properties(request.user), *filters)
+        rows = in_geohash_cells(qs, missing) \
+            .annotate(cell=Substr('geohash', 1, precision)) \
+            .values('cell') \
+            .annotate(
+                count=Count('id'),
+                lat=Avg('latitude'),
+                lon=Avg('longitude'),
+                min_price=Min('price'),
+                max_price=Max('price'),
+                first_id=Min('id'),
+            ).order_by()
+
+        for row in rows:
+            cluster = {
+                "cell": row['cell'],
+                "count": row['count'],
+                "lat": row['lat'],
+                "lon": row['lon'],
+                "min_price": f"{row['min_price']:.2f}",
+                "max_price": f"{row['max_price']:.2f}",
+            }
+            if row['count'] == 1:
+                cluster["property_id"] = row['first_id']
+            fresh[tile_keys[row['cell'][:len(missing[0])]]].append(cluster)
+
+        cache.set_many(fresh, settings.LISTING_CACHE_TIMEOUT)
+        cached.update(fresh)
+
+    clusters = [
+        cluster
+        for tile in tiles
+        for cluster in cached[tile_keys[tile]]
+        if south <= cluster['lat'] <= north and west <= cluster['lon'] <= east
+    ]
+    return JsonResponse({"zoom": zoom, "precision": precision, "clusters": clusters})
+
 @require_GET
 def get_presigned_url(request):
     extension = request.GET.get('extension', 'jpg')
@@ -0,0 +1,69 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Collection, CollectionAccess, Property
+from .versions import get_version
+
+HIDDEN_KEY = "listing_service:hidden_collections:{}:{}"
+
+
+def hidden_collection_ids(user):
+    """
+    Ids of the private collections whose properties this user can't see:
+    every private collection they neither own nor were approved for. Cached
+    per user; a user's entry is dropped when their access changes and every
+    entry goes stale when any collection is saved or deleted.
+    """
+    if user.is_authenticated and user.role == 'librarian':
+        return frozenset()
+
+    private = Collection.objects.filter(private=True)
+    if not user.is_authenticated:
+        return frozenset(private.values_list('id', flat=True))
+
+    key = HIDDEN_KEY.format(get_version('collections'), user.id)
+    hidden = cache.get(key)
+    if hidden is None:
+        hidden = frozenset(
+            private.exclude(owner=user)
+            .exclude(id__in=CollectionAccess.objects.filter(user=user, status='approved').values('collection_id'))
+            .values_list('id', flat=True)
+        )
+        cache.set(key, hidden, settings.LISTING_CACHE_TIMEOUT)
+    return hidden
+
+
+def forget_user(user_id):
+    transaction.on_commit(lambda: cache.delete(HIDDEN_KEY.format(get_version('collections'), user_id)))
+
+
+def visible_properties(user, queryset=None):
+    # librarians see everything; everyone else only sees private-collection
+    # properties of collections they own or were approved for
+    qs = Property.objects.all() if queryset is None else queryset
+    hidden = hidden_collection_ids(user)
+    if hidden:
+        qs = qs.exclude(private_collection_id__in=hidden)
+    return qs
+
+
+def can_view(user, property_obj):
+    if property_obj.private_collection_id is None:
+        return True
+    if not user.is_authenticated:
+        return False
+    if user.id == property_obj.owner_id:
+        return True
+    return property_obj.private_collection_id not in hidden_collection_ids(user)
+
+
+def visibility_key(user):
+    # users who see the same set of properties share cache entries
+    hidden = hidden_collection_ids(user)
+    if not hidden:
+        return 'all'
+    digest = hashlib.sha1(','.join(str(pk) for pk in sorted(hidden)).encode()).hexdigest()
+    return f'hidden:{digest}'
@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from .background import submit_once
+from .geocoding import address_key
+from .models import Property, WalkScore
+
+WALKSCORE_URL = "https://api.walkscore.com/score"
+
+
+def fetch_walk_score(property_obj):
+    """Call the Walk Score API and return the WalkScore fields to store."""
+    params = {
+        'format': 'json',
+        'lat': property_obj.latitude,
+        'lon': property_obj.longitude,
+        'address': property_obj.location,
+        'transit': '1',
+        'bike': '1',
+        'wsapikey': settings.WALKSCORE_API_KEY
+    }
+
+    try:
+        response = requests.get(WALKSCORE_URL, params=params, timeout=5)
+        response.raise_for_status()
+        data = response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        return {'error': str(e)[:255] or 'Walk Score request failed'}
+
+    # the API answers 200 with a status code in the body; 1 means success
+    if data.get('status', 1) != 1:
+        return {'error': f"Walk Score unavailable (status {data.get('status')})"}
+
+    return {
+        'walkscore': data.get('walkscore', None),
+        'bikescore': (data.get('bike') or {}).get('score', None),
+        'transitscore': (data.get('transit') or {}).get('score', None),
+        'description': (data.get('description') or '')[:255],
+        'error': '',
+    }
+
+
+def refresh_walk_score(property_obj):
+    """Fetch and store the scores for a property's address, including failures."""
+    fields = {
+        'walkscore': None,
+        'bikescore': None,
+        'transitscore': None,
+        'description': '',
+        **fetch_walk_score(property_obj),
+        'address': property_obj.location,
+        'fetched_at': timezone.now(),
+    }
+    score, _ = WalkScore.objects.update_or_create(
+        address_key=address_key(property_obj.location),
+        defaults=fields,
+    )
+    return score
+
+
+def _refresh_walk_score_by_id(property_id):
+    property_obj = Property.objects.filter(id=property_id).first()
+    if property_obj is not None and property_obj.has_coordinates:
+        refresh_walk_score(property_obj)
+
+
+def is_stale(score):
+    ttl = settings.WALKSCORE_NEGATIVE_CACHE_TTL if score.error else settings.WALKSCORE_CACHE_TTL
+    return score.fetched_at + timedelta(seconds=ttl) < timezone.now()
+
+
+def cached_walk_score(property_obj):
+    """
+    Return the stored scores for a property's address. Stale rows are served
+    as-is and refreshed in the background; only a first lookup waits on the API.
+    """
+    key = address_key(property_obj.location)
+    score = WalkScore.objects.filter(address_key=key).first()
+
+    if score is None:
+        return refresh_walk_score(property_obj)
+
+    if is_stale(score):
+        submit_once(('walkscore', key), _refresh_walk_score_by_id, property_obj.id)
+    return score
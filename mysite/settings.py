@@ -13,7 +13,7 @@ import os
 from pathlib import Path
 
 import dj_database_url
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -50,6 +50,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites',  # <- 필수
+    'django.contrib.postgres',  # trigram lookups for fuzzy search
 
     # allauth apps
     'allauth',
@@ -96,6 +97,30 @@ GOOGLE_SECRET_KEY = config("GOOGLE_SECRET_KEY")
 
 # Walk Score API
 WALKSCORE_API_KEY = config('WALKSCORE_API_KEY')
+# seconds a stored score is served before it is refreshed in the background
+WALKSCORE_CACHE_TTL = config('WALKSCORE_CACHE_TTL', default=60 * 60 * 24 * 30, cast=int)
+WALKSCORE_NEGATIVE_CACHE_TTL = config('WALKSCORE_NEGATIVE_CACHE_TTL', default=60 * 60 * 6, cast=int)
+
+# Geocoders tried in order; the local gazetteer answers offline, Nominatim is the fallback
+GEOCODER_BACKENDS = config(
+    'GEOCODER_BACKENDS',
+    default='listing_service.geocoding.GazetteerGeocoder,listing_service.geocoding.NominatimGeocoder',
+    cast=Csv(),
+)
+GAZETTEER_FUZZY_THRESHOLD = config('GAZETTEER_FUZZY_THRESHOLD', default=0.6, cast=float)
+GAZETTEER_RELOAD_INTERVAL = config('GAZETTEER_RELOAD_INTERVAL', default=300, cast=int)
+
+# Fuzzy search, used when a search finds nothing: the share of a query's trigrams that
+# must appear in a title or location (pg_trgm word_similarity), and the most hits kept
+FUZZY_SEARCH_THRESHOLD = config('FUZZY_SEARCH_THRESHOLD', default=0.4, cast=float)
+FUZZY_SEARCH_LIMIT = config('FUZZY_SEARCH_LIMIT', default=200, cast=int)
+
+# Geocoding backfill (Nominatim allows about 1 request per second)
+GEOCODE_RATE_LIMIT = config('GEOCODE_RATE_LIMIT', default=1.0, cast=float)
+GEOCODE_CHECKPOINT_FILE = config('GEOCODE_CHECKPOINT_FILE', default=str(BASE_DIR / 'geocode_checkpoint.json'))
+
+# Widest bounding box, in degrees of latitude or longitude, a map search may ask for (about 70 miles)
+GEO_SEARCH_MAX_BBOX_DEGREES = config('GEO_SEARCH_MAX_BBOX_DEGREES', default=1.0, cast=float)
 
 # Remove Middle Page for Google Login
 SOCIALACCOUNT_LOGIN_ON_GET = True
@@ -194,6 +219,22 @@ else:
         }
     }
 
+# Cache
+# Listing caches are invalidated by bumping version counters kept in this cache,
+# so deployments with several worker processes should point it at a shared backend
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='hooshousing'),
+    }
+}
+# seconds cached listing data lives even without a version bump
+LISTING_CACHE_TIMEOUT = config('LISTING_CACHE_TIMEOUT', default=300, cast=int)
+# rendered property cards, keyed by Property.version so edits replace them
+PROPERTY_CARD_CACHE_TIMEOUT = config('PROPERTY_CARD_CACHE_TIMEOUT', default=86400, cast=int)
+# rows per page on property and collection listings
+LISTING_PAGE_SIZE = config('LISTING_PAGE_SIZE', default=24, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
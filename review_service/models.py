@@ -7,6 +7,7 @@ class Review(models.Model):
     property = models.ForeignKey("listing_service.Property", on_delete=models.CASCADE)
     rating = models.DecimalField(max_digits=2, decimal_places=1)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('user', 'property')
@@ -4,6 +4,7 @@ from .models import Review
 from listing_service.models import Property
 from decimal import Decimal
 from django.contrib import messages
+from django.db import transaction
 
 @login_required
 def add_review(request, property_id):
@@ -30,12 +31,14 @@ def add_review(request, property_id):
             # Redirect to edit page instead
             return redirect("review_service:edit_review", review_id=existing.id)
 
-        Review.objects.create(
-            user=request.user,
-            property=property_obj,
-            content=content,
-            rating=rating
-        )
+        with transaction.atomic():
+            Review.objects.create(
+                user=request.user,
+                property=property_obj,
+                content=content,
+                rating=rating
+            )
+            Property.record_rating(property_obj.id, added=rating)
 
     return redirect("listing_service:property_details", property_id=property_id)
 
@@ -45,12 +48,18 @@ def edit_review(request, review_id):
     property_obj = review.property
 
     if request.method == "POST":
-        review.content = request.POST.get("content", review.content)
-        try:
-            review.rating = Decimal(request.POST.get("rating", review.rating))
-        except:
-            pass  # Keep the old rating if conversion fails
-        review.save()
+        with transaction.atomic():
+            # lock the row so the rating we take back out is the one stored
+            review = Review.objects.select_for_update().get(id=review.id)
+            old_rating = review.rating
+            review.content = request.POST.get("content", review.content)
+            try:
+                review.rating = Decimal(request.POST.get("rating", review.rating))
+            except:
+                pass  # Keep the old rating if conversion fails
+            review.save()
+            if review.rating != old_rating:
+                Property.record_rating(review.property_id, added=review.rating, removed=old_rating)
         return redirect("listing_service:property_details", property_id=review.property.id)
 
     return redirect("listing_service:property_details", property_id=review.property.id)
@@ -59,5 +68,9 @@ def edit_review(request, review_id):
 def delete_review(request, review_id):
     review = get_object_or_404(Review, id=review_id)
     if review.user == request.user:
-        review.delete()
+        with transaction.atomic():
+            # a second, concurrent delete removes nothing and must not count twice
+            deleted, _ = Review.objects.filter(id=review.id).delete()
+            if deleted:
+                Property.record_rating(review.property_id, removed=review.rating)
     return redirect('listing_service:property_details', property_id=review.property.id)
\ No newline at end of file